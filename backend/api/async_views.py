@@ -0,0 +1,165 @@
+"""Async read path of recipes and the catalogue for ASGI servers.
+
+Django 3.2 has no async ORM, so every query runs in a worker thread
+behind ``sync_to_async`` and independent ones are awaited together.
+Requests the async path does not cover go to the DRF viewsets.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage, Page
+from django.db import close_old_connections
+from django.db.models import prefetch_related_objects
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from .membership import get_request_membership
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}
+
+
+def in_thread(func, *args, **kwargs):
+    """Run blocking ORM code in a worker thread with its own connection."""
+    def run():
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+def get_queryset(view, request):
+    """Authenticate, check permissions and build the filtered queryset."""
+    view.initial(request)
+
+    return view.filter_queryset(view.get_queryset()).prefetch_related(None)
+
+
+def load_membership(request):
+    if request.user.is_authenticated:
+        get_request_membership(request)
+
+
+def prefetch_lookup(instances, lookup):
+    prefetch_related_objects(instances, lookup)
+
+
+def serialize(view, *args, **kwargs):
+    return view.get_serializer(*args, **kwargs).data
+
+
+def handle_exception(view, request, exc):
+    return view.finalize_response(request, view.handle_exception(exc))
+
+
+async def prefetch(view, request, instances):
+    """Run every prefetch lookup of the serializer concurrently."""
+    for instance in instances:
+        # Lookups running side by side must share one cache per instance.
+        instance.__dict__.setdefault('_prefetched_objects_cache', {})
+    lookups = view.get_serializer_class().get_prefetch_related(request.user)
+    await asyncio.gather(*(
+        in_thread(prefetch_lookup, instances, lookup) for lookup in lookups
+    ))
+
+
+def get_page_number(request):
+    """Page number the async path can serve, ``None`` to fall back."""
+    if 'cursor' in request.GET:
+        return None
+    number = request.GET.get('page', '1')
+
+    return int(number) if number.isdigit() and int(number) > 0 else None
+
+
+async def list_recipes(view, request, **kwargs):
+    number = get_page_number(request._request)
+    if number is None:
+        return None
+    queryset = await in_thread(get_queryset, view, request)
+    paginator = view.paginator
+    page_size = paginator.get_page_size(request)
+    offset = (number - 1) * page_size
+    count, recipes, _ = await asyncio.gather(
+        in_thread(queryset.count),
+        in_thread(list, queryset[offset:offset + page_size]),
+        in_thread(load_membership, request),
+    )
+    django_paginator = paginator.django_paginator_class(queryset, page_size)
+    django_paginator.count = count
+    try:
+        page = Page(
+            recipes, django_paginator.validate_number(number),
+            django_paginator)
+    except InvalidPage as exc:
+        raise NotFound(paginator.invalid_page_message.format(
+            page_number=number, message=str(exc)))
+    await prefetch(view, request, recipes)
+    data = await in_thread(serialize, view, recipes, many=True)
+    paginator.request = request
+    paginator.page = page
+
+    return paginator.get_paginated_response(data)
+
+
+async def retrieve_recipe(view, request, pk):
+    queryset = await in_thread(get_queryset, view, request)
+    recipe, _ = await asyncio.gather(
+        in_thread(queryset.filter(pk=pk).first),
+        in_thread(load_membership, request),
+    )
+    if recipe is None:
+        raise NotFound
+    view.check_object_permissions(request, recipe)
+    await prefetch(view, request, [recipe])
+
+    return Response(await in_thread(serialize, view, recipe))
+
+
+def async_view(viewset, actions, handler=None):
+    """GET through ``handler`` when it can serve it, the rest synchronously.
+
+    Without a handler the whole viewset runs in a worker thread, which
+    frees the event loop while the catalogue is read.
+    """
+    sync_view = viewset.as_view(actions)
+
+    async def view(request, **kwargs):
+        if handler is None:
+            return await in_thread(sync_view, request, **kwargs)
+        if request.method != 'GET':
+            return await sync_to_async(sync_view)(request, **kwargs)
+        instance = viewset(action_map=actions, args=(), kwargs=kwargs)
+        drf_request = instance.initialize_request(request, **kwargs)
+        instance.request = drf_request
+        instance.headers = instance.default_response_headers
+        try:
+            response = await handler(instance, drf_request, **kwargs)
+        except Exception as exc:
+            return await in_thread(
+                handle_exception, instance, drf_request, exc)
+        if response is None:
+            return await in_thread(sync_view, request, **kwargs)
+
+        return instance.finalize_response(drf_request, response)
+
+    view.csrf_exempt = True
+
+    return view
+
+
+recipe_list = async_view(RecipeViewSet, LIST_ACTIONS, list_recipes)
+recipe_detail = async_view(RecipeViewSet, DETAIL_ACTIONS, retrieve_recipe)
+tag_list = async_view(TagViewSet, {'get': 'list'})
+tag_detail = async_view(TagViewSet, {'get': 'retrieve'})
+ingredient_list = async_view(IngredientViewSet, {'get': 'list'})
+ingredient_detail = async_view(IngredientViewSet, {'get': 'retrieve'})
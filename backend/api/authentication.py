@@ -0,0 +1,32 @@
+from hashlib import sha256
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+from core.constants import AUTH_TOKEN_CACHE_TIMEOUT
+
+
+def get_cache_key(key):
+    return f'auth-token:{sha256(key.encode()).hexdigest()}'
+
+
+def invalidate_tokens(keys):
+    cache_keys = [get_cache_key(key) for key in keys]
+    cache.delete_many(cache_keys)
+    # A request racing the transaction may cache the user it replaced.
+    transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication reading the token owner from the cache."""
+
+    def authenticate_credentials(self, key):
+        cache_key = get_cache_key(key)
+        user = cache.get(cache_key)
+        if user is not None:
+            return user, self.get_model()(key=key, user=user)
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, user, AUTH_TOKEN_CACHE_TIMEOUT)
+
+        return user, token
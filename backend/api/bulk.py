@@ -0,0 +1,110 @@
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef
+
+from core.signals import memberships_created, memberships_deleted
+
+CREATED = 'created'
+EXISTS = 'exists'
+DELETED = 'deleted'
+MISSING = 'missing'
+NOT_FOUND = 'not_found'
+
+
+def insert_returning(model, instances, field):
+    """Insert ``instances`` skipping conflicts, ``field`` of the new rows.
+
+    The ids come from the insert itself, so rows another request added
+    meanwhile are not reported (and counted) twice.
+    """
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    fields = [
+        model_field for model_field in model._meta.concrete_fields
+        if model_field is not model._meta.pk
+    ]
+    params = [
+        model_field.get_db_prep_save(
+            model_field.pre_save(instance, True), connection)
+        for instance in instances
+        for model_field in fields
+    ]
+    row = '({})'.format(', '.join(['%s'] * len(fields)))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(model._meta.db_table)} '
+            f'({", ".join(quote(field.column) for field in fields)}) '
+            f'VALUES {", ".join([row] * len(instances))} '
+            f'ON CONFLICT DO NOTHING '
+            f'RETURNING {quote(model._meta.get_field(field).column)}',
+            params,
+        )
+
+        return [target_id for target_id, in cursor.fetchall()]
+
+
+def delete_returning(model, user, field, ids):
+    """Delete the user's rows of ``ids``, ``field`` of the deleted ones."""
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    column = quote(model._meta.get_field(field).column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} '
+            f'WHERE {quote(model._meta.get_field("user").column)} = %s '
+            f'AND {column} IN ({", ".join(["%s"] * len(ids))}) '
+            f'RETURNING {column}',
+            [user.id, *ids],
+        )
+
+        return [target_id for target_id, in cursor.fetchall()]
+
+
+@transaction.atomic
+def link(user, model, field, targets, ids):
+    """Create the missing ``model`` rows for ``ids`` with a single insert."""
+    rows = model.objects.filter(user=user, **{field: OuterRef('pk')})
+    found = dict(targets.filter(id__in=ids).annotate(
+        linked=Exists(rows)
+    ).values_list('id', 'linked'))
+    missing = [
+        target_id for target_id, linked in found.items() if not linked]
+    created = set()
+    if missing:
+        created.update(insert_returning(
+            model,
+            [model(user=user, **{f'{field}_id': target_id})
+             for target_id in missing],
+            field,
+        ))
+    if created:
+        memberships_created.send(
+            sender=model, user_id=user.id,
+            ids=[target_id for target_id in ids if target_id in created])
+
+    return {
+        target_id: (
+            NOT_FOUND if target_id not in found
+            else CREATED if target_id in created else EXISTS
+        )
+        for target_id in ids
+    }
+
+
+@transaction.atomic
+def unlink(user, model, field, ids):
+    """Delete the ``model`` rows of ``ids`` with a single delete.
+
+    Nothing references membership rows, so they go without the per-row
+    signals of ``QuerySet.delete()`` and one ``memberships_deleted``
+    updates the aggregates for the rows the delete actually removed.
+    """
+    deleted = set(delete_returning(model, user, field, ids))
+    if deleted:
+        memberships_deleted.send(
+            sender=model, user_id=user.id,
+            ids=[target_id for target_id in ids if target_id in deleted])
+
+    return {
+        target_id: DELETED if target_id in deleted else MISSING
+        for target_id in ids
+    }
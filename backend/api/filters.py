@@ -1,10 +1,14 @@
+from django_filters.constants import EMPTY_VALUES
 from django_filters.rest_framework import FilterSet, filters
 from django.contrib.auth import get_user_model
 
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import search_recipes
 
 User = get_user_model()
 
+RECIPE_ORDERING_FIELDS = ('favorites_count', 'in_carts_count', 'pub_date')
+
 
 class TagFilter(FilterSet):
     name = filters.CharFilter(lookup_expr='isstartswith')
@@ -23,6 +27,18 @@ class IngredientFilter(FilterSet):
         fields = ('name', )
 
 
+class RecipeOrderingFilter(filters.OrderingFilter):
+    """Ordering by the chosen fields, newest recipes first on ties."""
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+
+        return qs.order_by(
+            *(self.get_ordering_value(param) for param in value),
+            '-pub_date', '-id')
+
+
 class RecipeFilter(FilterSet):
     tags = filters.ModelMultipleChoiceFilter(
         queryset=Tag.objects.all(),
@@ -38,10 +54,17 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart',
     )
+    search = filters.CharFilter(
+        method='get_search',
+    )
+    ordering = RecipeOrderingFilter(
+        fields=RECIPE_ORDERING_FIELDS,
+    )
 
     class Meta:
         model = Recipe
-        fields = ['is_favorited', 'author', 'tags', 'is_in_shopping_cart']
+        fields = ['is_favorited', 'author', 'tags', 'is_in_shopping_cart',
+                  'search', 'ordering']
 
     def get_is_favorited(self, queryset, name, value):
         user = self.request.user
@@ -56,3 +79,10 @@ class RecipeFilter(FilterSet):
             return queryset.filter(recipe_shopping_cart__user=user)
 
         return queryset
+
+    def get_search(self, queryset, name, value):
+        value = value.strip()
+        if value:
+            return search_recipes(queryset, value)
+
+        return queryset
@@ -0,0 +1,49 @@
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.constants import MEMBERSHIP_CACHE_TIMEOUT
+
+Membership = namedtuple(
+    'Membership', ('favorites', 'shopping_cart', 'subscriptions'))
+
+
+def get_cache_key(user_id):
+    return f'membership:{user_id}'
+
+
+def load_membership(user):
+    return Membership(
+        favorites=frozenset(
+            user.favorites.values_list('recipe_id', flat=True)),
+        shopping_cart=frozenset(
+            user.shopping_cart.values_list('recipe_id', flat=True)),
+        subscriptions=frozenset(
+            user.subscriptions.values_list('author_id', flat=True)),
+    )
+
+
+def get_membership(user):
+    key = get_cache_key(user.id)
+    membership = cache.get(key)
+    if membership is None:
+        membership = load_membership(user)
+        cache.set(key, membership, MEMBERSHIP_CACHE_TIMEOUT)
+
+    return membership
+
+
+def get_request_membership(request):
+    """Membership of the request user, read from the cache once."""
+    if not hasattr(request, '_membership'):
+        request._membership = get_membership(request.user)
+
+    return request._membership
+
+
+def invalidate_membership(user_id):
+    key = get_cache_key(user_id)
+    cache.delete(key)
+    # A read racing the transaction may cache the sets it had not changed.
+    transaction.on_commit(lambda: cache.delete(key))
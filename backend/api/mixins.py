@@ -1,8 +1,119 @@
-from rest_framework import mixins
+from hashlib import md5
+
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from rest_framework import mixins, status
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from core.constants import CATALOGUE_CACHE_TIMEOUT
+from recipes.catalogue import get_catalogue_version
+from .bulk import link, unlink
+from .serializers import BulkIdsSerializer
+
 
 class CreateDeleteViewSet(mixins.CreateModelMixin,
                           mixins.DestroyModelMixin,
                           GenericViewSet):
     pass
+
+
+class EagerLoadingViewSetMixin:
+    """Applies the eager loading plan of the current serializer class."""
+
+    def setup_eager_loading(self, queryset):
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(
+                queryset, self.request.user)
+
+        return queryset
+
+    def get_queryset(self):
+        return self.setup_eager_loading(super().get_queryset())
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if page is not None and hasattr(serializer_class, 'prefetch_page'):
+            serializer_class.prefetch_page(page, self.request)
+
+        return page
+
+
+class CatalogueCacheMixin:
+    """Caches list/retrieve responses of reference data by its version."""
+
+    def get_cache_key(self, request):
+        model = self.queryset.model
+        digest = md5(request.get_full_path().encode()).hexdigest()
+        return (
+            f'catalogue:{model._meta.label_lower}:'
+            f'{get_catalogue_version(model)}:{digest}'
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        key = self.get_cache_key(request)
+        etag = f'"{md5(key.encode()).hexdigest()}"'
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+
+        data = cache.get(key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(key, data, CATALOGUE_CACHE_TIMEOUT)
+
+        return Response(data, headers=headers)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class CursorPaginationMixin:
+    """Switches to keyset pagination when the client sends ?cursor=."""
+
+    cursor_pagination_class = None
+
+    def get_cursor_pagination_class(self):
+        return self.cursor_pagination_class
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.get_cursor_pagination_class()
+            if (pagination_class is not None
+                    and 'cursor' in self.request.query_params):
+                self._paginator = pagination_class()
+
+        return super().paginator
+
+
+class BulkMembershipMixin:
+    """Adds or removes many favorites, cart rows or subscriptions at once."""
+
+    def bulk_membership(self, request, model, field, targets):
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        if request.method == 'POST':
+            results = link(request.user, model, field, targets, ids)
+        else:
+            results = unlink(request.user, model, field, ids)
+
+        return Response([
+            {'id': target_id, 'status': result}
+            for target_id, result in results.items()
+        ])
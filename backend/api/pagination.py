@@ -0,0 +1,34 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+
+from core.constants import MAX_ELEMS_ON_PAGE, MAX_PAGE_SIZE
+
+
+class LimitCursorPagination(CursorPagination):
+    page_size = MAX_ELEMS_ON_PAGE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class RecipeCursorPagination(LimitCursorPagination):
+    ordering = ('-pub_date', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        # Most recipes share a counter value and counters change between
+        # page fetches: a cursor over them would page by OFFSET inside the
+        # ties and skip or repeat rows.
+        if request.query_params.get('ordering'):
+            raise ValidationError({
+                'ordering': 'Сортировка доступна только при постраничной '
+                            'навигации (?page=), без ?cursor='
+            })
+
+        return self.ordering
+
+
+class FeedCursorPagination(RecipeCursorPagination):
+    ordering = ('-id',)
+
+
+class SubscriptionCursorPagination(LimitCursorPagination):
+    ordering = ('subs_date', 'id')
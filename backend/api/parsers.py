@@ -0,0 +1,65 @@
+import codecs
+import re
+from io import BytesIO
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import JSONParser
+
+from core.constants import MAX_JSON_BODY_SIZE
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson turns integers wider than 64 bits into floats.
+LONG_NUMBER = re.compile(rb'\d{19}')
+
+
+class RequestTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = (
+        f'Тело запроса не больше {MAX_JSON_BODY_SIZE // (1024 * 1024)} МБ')
+    default_code = 'request_too_large'
+
+
+def get_content_length(parser_context):
+    request = (parser_context or {}).get('request')
+    if request is None:
+        return None
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return None
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser through orjson when it is installed, same result.
+
+    Bodies larger than ``MAX_JSON_BODY_SIZE`` are refused before they
+    are read. Bodies in other encodings than UTF-8, with long numbers or
+    that orjson rejects go through the stdlib parser and its error
+    messages.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        content_length = get_content_length(parser_context)
+        if content_length and content_length > MAX_JSON_BODY_SIZE:
+            raise RequestTooLarge
+        content = stream.read(MAX_JSON_BODY_SIZE + 1)
+        if len(content) > MAX_JSON_BODY_SIZE:
+            raise RequestTooLarge
+        if orjson is None:
+            return super().parse(BytesIO(content), media_type, parser_context)
+        encoding = (parser_context or {}).get(
+            'encoding', settings.DEFAULT_CHARSET)
+        if (codecs.lookup(encoding).name == 'utf-8'
+                and not LONG_NUMBER.search(content)):
+            try:
+                return orjson.loads(content)
+            except orjson.JSONDecodeError:
+                pass
+
+        return super().parse(BytesIO(content), media_type, parser_context)
@@ -0,0 +1,45 @@
+from django.db.models import F, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+
+
+def limit_per_author(queryset, author_ids, limit):
+    """Keep at most ``limit`` newest recipes of every author."""
+    ranked = queryset.filter(author_id__in=author_ids).annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=F('author_id'),
+            order_by=(F('pub_date').desc(), F('id').desc()),
+        )
+    ).order_by().values('id', 'row_number')
+    sql, params = ranked.query.sql_with_params()
+
+    return queryset.filter(id__in=RawSQL(
+        f'SELECT id FROM ({sql}) AS ranked WHERE row_number <= %s',
+        (*params, limit)
+    ))
+
+
+class EagerLoadingMixin:
+    """Plan of relations the serializer walks, applied to a queryset."""
+
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def get_prefetch_related(cls, user):
+        return cls.prefetch_related_fields
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, user):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        prefetch_related = cls.get_prefetch_related(user)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+
+        return queryset
+
+    @classmethod
+    def prefetch_page(cls, instances, request):
+        """Load relations that depend on the objects of the current page."""
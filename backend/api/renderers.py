@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.profiling import format_prometheus
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson else 0
+)
+
+encoder = JSONEncoder()
+
+
+class PlainTextRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = '\n'.join(f'{key}: {value}' for key, value in data.items())
+
+        return str(data).encode(self.charset)
+
+
+class CSVRenderer(PlainTextRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, list):
+            return PlainTextRenderer().render(data)
+
+        return format_prometheus(data).encode(self.charset)
+
+
+def encode_default(obj):
+    """Types orjson hands back, converted the way DRF's encoder does."""
+    value = encoder.default(obj)
+    if isinstance(obj, Decimal) and 'e' in repr(value):
+        # orjson writes exponents as 1e16, the stdlib as 1e+16.
+        raise TypeError
+
+    return value
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer through orjson when it is installed, same output.
+
+    Pretty printing, non-default JSON settings and anything orjson
+    cannot encode go through the stdlib renderer. Only plain float
+    values would differ: orjson writes 1e16 and NaN as null, the API
+    has no float fields.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None
+                or data is None
+                or self.ensure_ascii
+                or not self.compact
+                or self.get_indent(
+                    accepted_media_type, renderer_context or {}) is not None):
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=encode_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context)
+
+        return ret.replace(
+            '\u2028'.encode(), b'\\u2028'
+        ).replace('\u2029'.encode(), b'\\u2029')
@@ -1,28 +1,151 @@
-import base64
+import binascii
+from io import BytesIO
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import check_password
-from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            TemporaryUploadedFile,
+                                            UploadedFile)
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Prefetch, prefetch_related_objects
 from djoser.serializers import (PasswordSerializer, UserCreateSerializer,
                                 UserSerializer)
 from rest_framework import serializers
 
+from core import constants
 from recipes.models import (AmountIngredient, Favorites, Ingredient,
-                            Recipe, ShoppingCart, Tag)
+                            Recipe, ShoppingCart, ShoppingListItem, Tag)
+from recipes.feed import fan_out
+from recipes.shopping_list import change_recipe_amounts
 from users.models import Subscription
+from .membership import get_request_membership
+from .querysets import EagerLoadingMixin, limit_per_author
 
 User = get_user_model()
 
 
+def spool_upload(chunks, name, content_type):
+    """Collect chunks in memory, moving to a temporary file when large."""
+    file = BytesIO()
+    for chunk in chunks:
+        if (isinstance(file, BytesIO) and file.tell() + len(chunk)
+                > settings.FILE_UPLOAD_MAX_MEMORY_SIZE):
+            upload = TemporaryUploadedFile(name, content_type, 0, None)
+            upload.write(file.getvalue())
+            file = upload
+        file.write(chunk)
+    size = file.tell()
+    file.seek(0)
+    if isinstance(file, TemporaryUploadedFile):
+        file.size = size
+        return file
+
+    return InMemoryUploadedFile(file, None, name, content_type, size, None)
+
+
+def decode_base64(data, start):
+    """Decode base64 slice by slice, never holding a second full copy.
+
+    Whitespace is dropped and a group of less than four characters at
+    the end of a slice is carried over into the next one.
+    """
+    rest = ''
+    for offset in range(start, len(data), constants.BASE64_CHUNK_SIZE):
+        rest += ''.join(
+            data[offset:offset + constants.BASE64_CHUNK_SIZE].split())
+        end = len(rest) - len(rest) % 4
+        yield binascii.a2b_base64(rest[:end])
+        rest = rest[end:]
+    if rest:
+        yield binascii.a2b_base64(rest)
+
+
 class Base64ImageField(serializers.ImageField):
+    """Image sent as a data URI or as a regular multipart file."""
+
+    def size_error(self):
+        return serializers.ValidationError(
+            f'Размер изображения не больше '
+            f'{constants.MAX_IMAGE_SIZE // (1024 * 1024)} МБ')
+
+    def decode(self, data):
+        start = data.find(';base64,')
+        if start == -1:
+            raise serializers.ValidationError('Некорректное изображение')
+        content_type = data[len('data:'):start]
+        ext = content_type.split('/')[-1]
+        start += len(';base64,')
+        # Line-wrapped payloads carry whitespace the decoder skips.
+        encoded_size = len(data) - start - sum(
+            data.count(char, start) for char in ' \t\r\n')
+        if (encoded_size * 3 // 4 - data.rstrip()[-2:].count('=')
+                > constants.MAX_IMAGE_SIZE):
+            raise self.size_error()
+        chunks = decode_base64(data, start)
+        try:
+            return spool_upload(chunks, 'temp.' + ext, content_type)
+        except binascii.Error:
+            raise serializers.ValidationError('Некорректное изображение')
+
     def to_internal_value(self, data):
 
         if isinstance(data, str) and data.startswith('data:image'):
-            form, imgstr = data.split(';base64,')
-            ext = form.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = self.decode(data)
+        elif (isinstance(data, UploadedFile)
+                and data.size > constants.MAX_IMAGE_SIZE):
+            raise self.size_error()
+
+        image = super().to_internal_value(data)
+        if max(image.image.size) > constants.MAX_IMAGE_SIDE:
+            raise serializers.ValidationError(
+                f'Размер изображения не больше {constants.MAX_IMAGE_SIDE}px '
+                f'по каждой стороне')
+
+        return image
+
+
+class ThumbnailField(serializers.ReadOnlyField):
+    """URL of a recipe thumbnail, the original image until it is ready."""
+
+    def __init__(self, size, **kwargs):
+        self.size = size
+        super().__init__(**kwargs)
 
-        return super().to_internal_value(data)
+    def to_representation(self, recipe):
+        image = getattr(recipe, f'image_{self.size}') or recipe.image
+        if not image:
+            return None
+        request = self.context.get('request')
+        if request is None:
+            return image.url
+
+        return request.build_absolute_uri(image.url)
+
+
+class CreateOnceMixin:
+    """Lets the unique constraint reject duplicates instead of a lookup."""
+
+    duplicate_error = None
+
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {'errors': self.duplicate_error})
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=constants.MAX_BULK_IDS,
+    )
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
 
 
 class UserListSerializer(UserSerializer):
@@ -34,11 +157,9 @@ class UserListSerializer(UserSerializer):
                   'last_name', 'is_subscribed')
 
     def get_is_subscribed(self, obj):
-        return (self.context.get('request').user.is_authenticated
-                and Subscription.objects.filter(
-                    user=self.context.get('request').user,
-                    author=obj
-        ).exists())
+        request = self.context.get('request')
+        return (request.user.is_authenticated
+                and obj.id in get_request_membership(request).subscriptions)
 
 
 class CreateUserSerializer(UserCreateSerializer):
@@ -72,6 +193,17 @@ class SetPasswordSerializer(PasswordSerializer):
         return data
 
 
+def get_recipes_limit(request):
+    recipes_limit = request.query_params.get('recipes_limit')
+    if recipes_limit is None:
+        return None
+    if not recipes_limit.isdigit() or int(recipes_limit) < 1:
+        raise serializers.ValidationError({
+            'recipes_limit': 'Должно быть целым положительным числом'})
+
+    return int(recipes_limit)
+
+
 class SubscribeRecipeSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -79,7 +211,8 @@ class SubscribeRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class SubscriptionSerializer(CreateOnceMixin, EagerLoadingMixin,
+                             serializers.ModelSerializer):
     email = serializers.CharField(
         source='author.email',
         read_only=True
@@ -102,8 +235,10 @@ class SubscriptionSerializer(serializers.ModelSerializer):
     )
     recipes = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
-    recipes_count = serializers.ReadOnlyField(
-        source='author.recipe.count')
+    recipes_count = serializers.SerializerMethodField()
+
+    select_related_fields = ('author',)
+    duplicate_error = 'Вы уже подписаны на этого автора'
 
     class Meta:
         model = Subscription
@@ -119,15 +254,43 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 
         return data
 
+    @classmethod
+    def setup_eager_loading(cls, queryset, user):
+        return super().setup_eager_loading(queryset, user).annotate(
+            recipes_count=Count('author__recipes'))
+
+    @classmethod
+    def prefetch_page(cls, instances, request):
+        recipes = Recipe.objects.all()
+        recipes_limit = get_recipes_limit(request)
+        if recipes_limit:
+            recipes = limit_per_author(
+                recipes,
+                [subscription.author_id for subscription in instances],
+                recipes_limit
+            )
+        prefetch_related_objects(instances, Prefetch(
+            'author__recipes', queryset=recipes, to_attr='limited_recipes'))
+
     def get_recipes(self, obj):
-        return SubscribeRecipeSerializer(
-            obj.author.recipes.all(), many=True
-        ).data
+        recipes = getattr(obj.author, 'limited_recipes', None)
+        if recipes is None:
+            recipes = obj.author.recipes.all()
+            recipes_limit = get_recipes_limit(self.context.get('request'))
+            if recipes_limit:
+                recipes = recipes[:recipes_limit]
+
+        return SubscribeRecipeSerializer(recipes, many=True).data
 
     def get_is_subscribed(self, obj):
-        return Subscription.objects.filter(
-            user=self.context.get('request').user, author=obj.author
-        ).exists()
+        request = self.context.get('request')
+        return obj.author_id in get_request_membership(request).subscriptions
+
+    def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+
+        return obj.author.recipes.count()
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -167,7 +330,15 @@ class AmountIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class ShoppingCartSerializer(serializers.ModelSerializer):
+class ShoppingListItemSerializer(AmountIngredientSerializer):
+
+    class Meta:
+        model = ShoppingListItem
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
+class ShoppingCartSerializer(CreateOnceMixin, EagerLoadingMixin,
+                             serializers.ModelSerializer):
     id = serializers.ReadOnlyField(
         source='recipe.id',
     )
@@ -181,22 +352,20 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
     cooking_time = serializers.ReadOnlyField(
         source='recipe.cooking_time',
     )
+    image_small = ThumbnailField(
+        'small',
+        source='recipe',
+    )
+
+    select_related_fields = ('recipe',)
+    duplicate_error = 'Такой рецепт уже имеется в корзине'
 
     class Meta:
         model = ShoppingCart
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_small', 'cooking_time')
 
-    def validate(self, data):
-        user = self.context.get('request').user
-        recipe = self.context.get('recipe_id')
-        if ShoppingCart.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError({
-                'errors': 'Такой рецепт уже имеется в корзине'})
-
-        return data
 
-
-class RecipeListSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     ingredients = AmountIngredientSerializer(
         many=True,
         source='recipe',
@@ -211,37 +380,47 @@ class RecipeListSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_small = ThumbnailField(
+        'small',
+        source='*',
+    )
+    image_medium = ThumbnailField(
+        'medium',
+        source='*',
+    )
+
+    select_related_fields = ('author',)
+    prefetch_related_fields = ('tags', 'recipe__ingredient')
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+            'is_in_shopping_cart', 'name', 'image', 'image_small',
+            'image_medium', 'text', 'cooking_time', 'favorites_count',
+            'in_carts_count'
         )
 
     def get_is_favorited(self, obj):
-        if self.context.get('request').user.is_authenticated:
-
-            return Favorites.objects.filter(
-                    user=self.context.get('request').user,
-                    recipe=obj
-            ).exists()
+        request = self.context.get('request')
+        if request.user.is_authenticated:
+            return obj.id in get_request_membership(request).favorites
 
     def get_is_in_shopping_cart(self, obj):
-        if self.context.get('request').user.is_authenticated:
-
-            return ShoppingCart.objects.filter(
-                    user=self.context.get('request').user,
-                    recipe=obj
-            ).exists()
+        request = self.context.get('request')
+        if request.user.is_authenticated:
+            return obj.id in get_request_membership(request).shopping_cart
 
 
-class RecipeEditSerializer(serializers.ModelSerializer):
+class RecipeEditSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     image = Base64ImageField(
         max_length=None,
         use_url=True)
     ingredients = IngredientEditSerializer(
         many=True)
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False)
     author = serializers.PrimaryKeyRelatedField(
         read_only=True)
 
@@ -258,38 +437,80 @@ class RecipeEditSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    @classmethod
+    def setup_eager_loading(cls, queryset, user):
+        return RecipeListSerializer.setup_eager_loading(queryset, user)
+
     def validate(self, data):
+        errors = {}
         name = data.get('name')
-        if len(name) < 4:
-            raise serializers.ValidationError({
-                'name': 'Название рецепта минимум 4 символа'})
-        ingredients = data.get('ingredients')
-        for ingredient in ingredients:
-            if not Ingredient.objects.filter(
-                    id=ingredient['id']).exists():
-                raise serializers.ValidationError({
-                    'ingredients': f'Ингредиента с id - {ingredient["id"]} нет'
-                })
-        if len(ingredients) != len(set([item['id'] for item in ingredients])):
-            raise serializers.ValidationError(
-                'Ингредиенты не должны повторяться!')
-        tags = data.get('tags')
-        if len(tags) != len(set([item for item in tags])):
-            raise serializers.ValidationError({
-                'tags': 'Тэги не должны повторяться!'})
-        amounts = data.get('ingredients')
-        if [item for item in amounts if item['amount'] < 1]:
-            raise serializers.ValidationError({
-                'amount': 'Минимальное количество ингридиента 1'
-            })
+        if name is not None and len(name) < constants.MIN_LEN_RECIPE_NAME:
+            errors['name'] = (
+                f'Название рецепта минимум '
+                f'{constants.MIN_LEN_RECIPE_NAME} символа')
         cooking_time = data.get('cooking_time')
-        if cooking_time > 300 or cooking_time < 1:
-            raise serializers.ValidationError({
-                'cooking_time': 'Время приготовления блюда от 1 до 300 минут'
-            })
+        if cooking_time is not None and not (
+                constants.MIN_COOKING_VALUE
+                <= cooking_time
+                <= constants.MAX_COOKING_VALUE):
+            errors['cooking_time'] = (
+                f'Время приготовления блюда от {constants.MIN_COOKING_VALUE}'
+                f' до {constants.MAX_COOKING_VALUE} минут')
+        if 'ingredients' in data:
+            errors.update(self.check_ingredients(data['ingredients']))
+        if 'tags' in data:
+            errors.update(self.check_tags(data['tags']))
+        if errors:
+            raise serializers.ValidationError(errors)
 
         return data
 
+    @staticmethod
+    def find_duplicates(ids):
+        seen = set()
+        duplicates = set()
+        for item_id in ids:
+            if item_id in seen:
+                duplicates.add(item_id)
+            seen.add(item_id)
+
+        return seen, duplicates
+
+    def check_ingredients(self, ingredients):
+        errors = {}
+        ids, duplicates = self.find_duplicates(
+            ingredient['id'] for ingredient in ingredients)
+        missing = ids - set(Ingredient.objects.filter(
+            id__in=ids).values_list('id', flat=True))
+        messages = []
+        if missing:
+            messages.append(
+                f'Ингредиентов с id {sorted(missing)} нет')
+        if duplicates:
+            messages.append(
+                f'Ингредиенты не должны повторяться: {sorted(duplicates)}')
+        if messages:
+            errors['ingredients'] = messages
+        if any(ingredient['amount'] < constants.MIN_INGREDIENT_AMOUNT
+               for ingredient in ingredients):
+            errors['amount'] = (
+                f'Минимальное количество ингридиента '
+                f'{constants.MIN_INGREDIENT_AMOUNT}')
+
+        return errors
+
+    def check_tags(self, tags):
+        ids, duplicates = self.find_duplicates(tags)
+        missing = ids - set(
+            Tag.objects.filter(id__in=ids).values_list('id', flat=True))
+        messages = []
+        if missing:
+            messages.append(f'Тэгов с id {sorted(missing)} нет')
+        if duplicates:
+            messages.append('Тэги не должны повторяться!')
+
+        return {'tags': messages} if messages else {}
+
     def create_ingredients(self, ingredients, recipe):
         amount_ingredients = [
             AmountIngredient(
@@ -300,27 +521,68 @@ class RecipeEditSerializer(serializers.ModelSerializer):
         ]
         AmountIngredient.objects.bulk_create(amount_ingredients)
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_ingredients(ingredients, recipe)
+        fan_out(recipe)
 
         return recipe
 
+    def update_ingredients(self, ingredients, recipe):
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        deltas = dict(amounts)
+        removed = []
+        changed = []
+        for amount_ingredient in recipe.recipe.all():
+            amount = amounts.pop(amount_ingredient.ingredient_id, None)
+            deltas[amount_ingredient.ingredient_id] = (
+                (amount or 0) - amount_ingredient.amount)
+            if amount is None:
+                removed.append(amount_ingredient.id)
+            elif amount != amount_ingredient.amount:
+                amount_ingredient.amount = amount
+                changed.append(amount_ingredient)
+        if removed:
+            AmountIngredient.objects.filter(id__in=removed).delete()
+        if changed:
+            AmountIngredient.objects.bulk_update(changed, ('amount',))
+        if amounts:
+            self.create_ingredients(
+                [{'id': ingredient_id, 'amount': amount}
+                 for ingredient_id, amount in amounts.items()],
+                recipe
+            )
+        change_recipe_amounts(recipe.id, deltas)
+
+    def update_tags(self, tags, recipe):
+        current = {tag.id for tag in recipe.tags.all()}
+        tags = set(tags)
+        if current - tags:
+            recipe.tags.remove(*(current - tags))
+        if tags - current:
+            recipe.tags.add(*(tags - current))
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         if 'ingredients' in validated_data:
-            ingredients = validated_data.pop('ingredients')
-            instance.ingredients.clear()
-            self.create_ingredients(ingredients, instance)
+            self.update_ingredients(
+                validated_data.pop('ingredients'), instance)
         if 'tags' in validated_data:
-            instance.tags.set(
-                validated_data.pop('tags'))
+            self.update_tags(validated_data.pop('tags'), instance)
 
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance], *RecipeListSerializer.prefetch_related_fields)
+
         return RecipeListSerializer(
             instance,
             context={
@@ -328,7 +590,8 @@ class RecipeEditSerializer(serializers.ModelSerializer):
             }).data
 
 
-class FavoriteRecipeSerializer(serializers.ModelSerializer):
+class FavoriteRecipeSerializer(CreateOnceMixin, EagerLoadingMixin,
+                               serializers.ModelSerializer):
     id = serializers.ReadOnlyField(
         source='recipe.id',
     )
@@ -342,16 +605,14 @@ class FavoriteRecipeSerializer(serializers.ModelSerializer):
     cooking_time = serializers.ReadOnlyField(
         source='recipe.cooking_time',
     )
+    image_small = ThumbnailField(
+        'small',
+        source='recipe',
+    )
+
+    select_related_fields = ('recipe',)
+    duplicate_error = 'Этот рецепт уже добавлен в избранное'
 
     class Meta:
         model = Favorites
-        fields = ('id', 'name', 'image', 'cooking_time')
-
-    def validate(self, data):
-        user = self.context.get('request').user
-        recipe = self.context.get('recipe_id')
-        if Favorites.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError({
-                'errors': 'Этот рецепт уже добавлен в избранное'})
-
-        return data
+        fields = ('id', 'name', 'image', 'image_small', 'cooking_time')
@@ -0,0 +1,75 @@
+import csv
+import json
+
+from django.db.models import F
+
+from recipes.models import ShoppingListItem
+
+TXT_HEADER = 'Список необходимых ингредиентов:\n\n'
+CSV_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+
+
+class Echo:
+    """File-like object handing csv.writer rows back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def get_shopping_list(user):
+    return ShoppingListItem.objects.filter(user=user).values(
+        'ingredient',
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit'),
+        total_amount=F('amount'),
+    ).order_by('name')
+
+
+def stream_txt(rows):
+    yield TXT_HEADER
+    for row in rows:
+        yield (
+            f'{row["name"]} ({row["measurement_unit"]})'
+            f' — {row["total_amount"]}\n'
+        )
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for row in rows:
+        yield writer.writerow(
+            (row['name'], row['measurement_unit'], row['total_amount']))
+
+
+def stream_json(rows):
+    yield '['
+    separator = ''
+    for row in rows:
+        yield separator + json.dumps({
+            'id': row['ingredient'],
+            'name': row['name'],
+            'measurement_unit': row['measurement_unit'],
+            'amount': row['total_amount'],
+        }, ensure_ascii=False)
+        separator = ', '
+    yield ']'
+
+
+EXPORTERS = {
+    'txt': stream_txt,
+    'csv': stream_csv,
+    'json': stream_json,
+}
+
+
+def stream_shopping_list(user, export_format):
+    """Rows are read here, in the view thread, and only formatted lazily.
+
+    Under ASGI Django 3.2 iterates streaming responses in the event loop,
+    where the ORM refuses to run. A user's list holds one row per
+    ingredient, so it fits in memory.
+    """
+    rows = list(get_shopping_list(user))
+
+    return EXPORTERS[export_format](rows)
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from rest_framework.authtoken.models import Token
+
+from core.signals import memberships_created, memberships_deleted
+from recipes.models import Favorites, ShoppingCart
+from users.models import Subscription
+from .authentication import invalidate_tokens
+from .membership import invalidate_membership
+
+User = get_user_model()
+
+
+def invalidate_user_membership(sender, instance, **kwargs):
+    invalidate_membership(instance.user_id)
+
+
+def invalidate_bulk_membership(sender, user_id, **kwargs):
+    invalidate_membership(user_id)
+
+
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+def invalidate_user_tokens(sender, instance, **kwargs):
+    # Password changes and deactivation save the user.
+    invalidate_tokens(
+        Token.objects.filter(user=instance).values_list('key', flat=True))
+
+
+for model in (Favorites, ShoppingCart, Subscription):
+    for signal in (post_save, post_delete):
+        signal.connect(
+            invalidate_user_membership,
+            sender=model,
+            dispatch_uid=f'membership_{signal}_{model.__name__}',
+        )
+    memberships_created.connect(
+        invalidate_bulk_membership,
+        sender=model,
+        dispatch_uid=f'membership_bulk_{model.__name__}',
+    )
+    memberships_deleted.connect(
+        invalidate_bulk_membership,
+        sender=model,
+        dispatch_uid=f'membership_bulk_delete_{model.__name__}',
+    )
+
+post_delete.connect(
+    invalidate_deleted_token,
+    sender=Token,
+    dispatch_uid='auth_token_delete',
+)
+post_save.connect(
+    invalidate_user_tokens,
+    sender=User,
+    dispatch_uid='auth_token_user_save',
+)
@@ -0,0 +1,402 @@
+import base64
+import shutil
+import tempfile
+from itertools import count
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIClient
+
+from core import constants
+from core.profiling import track_queries
+from recipes.models import (AmountIngredient, CatalogueVersion, Favorites,
+                            Ingredient, Recipe, ShoppingCart,
+                            ShoppingListItem, Tag)
+from recipes.shopping_list import (compute_shopping_lists,
+                                   get_stored_shopping_lists)
+from users.models import Subscription
+from .bulk import delete_returning, insert_returning
+from .serializers import decode_base64
+
+User = get_user_model()
+
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAC'
+    'hwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+
+class APITestCase(TransactionTestCase):
+    """Committed fixtures, the async views query from worker threads."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root, IMAGE_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+        self.names = count()
+        self.user = self.create_user('reader')
+        self.client = self.get_client(self.user)
+        self.tags = [
+            Tag.objects.create(name=f'tag {index}', slug=f'tag-{index}',
+                               color=f'#00000{index}')
+            for index in range(2)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(name=f'ingredient {index}',
+                                      measurement_unit='г')
+            for index in range(3)
+        ]
+
+    def create_user(self, username):
+        return User.objects.create_user(
+            username=username, email=f'{username}@example.com',
+            password='password', first_name=username, last_name=username)
+
+    def get_client(self, user):
+        client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        return client
+
+    def create_recipe(self, author, amounts=(1, 2, 3)):
+        recipe = Recipe.objects.create(
+            author=author, name=f'Рецепт {next(self.names)}',
+            text='Описание', cooking_time=10,
+            image=SimpleUploadedFile('recipe.png', PNG))
+        recipe.tags.set(self.tags)
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(recipe=recipe, ingredient=ingredient,
+                             amount=amount)
+            for ingredient, amount in zip(self.ingredients, amounts))
+
+        return recipe
+
+    def asgi_get(self, user, path, query_string=''):
+        """GET through the ASGI handler the deployment runs."""
+        token, _ = Token.objects.get_or_create(user=user)
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'query_string': query_string.encode(),
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Token {token.key}'.encode()),
+            ],
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(get_asgi_application())(scope, receive, send)
+
+        return messages[0]['status'], b''.join(
+            message.get('body', b'') for message in messages[1:])
+
+    def count_queries(self, method, url, **kwargs):
+        with track_queries() as timer:
+            response = getattr(self.client, method)(url, **kwargs)
+
+        return response, timer.count
+
+
+class RecipeListQueriesTest(APITestCase):
+    # Recipes with author and flags, tags, ingredient amounts and their
+    # ingredients; token and membership come from the warm cache.
+    CURSOR_QUERIES = 4
+    # Plus the COUNT(*) of the page number pagination.
+    PAGE_QUERIES = 5
+
+    def setUp(self):
+        super().setUp()
+        authors = [self.create_user(f'author{index}') for index in range(3)]
+        for index in range(30):
+            recipe = self.create_recipe(authors[index % len(authors)])
+            if index % 2:
+                Favorites.objects.create(user=self.user, recipe=recipe)
+                ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        Subscription.objects.create(user=self.user, author=authors[0])
+
+    def measure(self, url, size):
+        self.client.get(url)
+        response, queries = self.count_queries('get', url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), size)
+
+        return queries
+
+    def test_page_queries_do_not_depend_on_page_size(self):
+        counts = []
+        for size in (6, 30):
+            with patch.object(PageNumberPagination, 'page_size', size):
+                counts.append(self.measure('/api/recipes/', size))
+        self.assertEqual(counts, [self.PAGE_QUERIES] * 2)
+
+    def test_cursor_queries_do_not_depend_on_limit(self):
+        self.assertEqual(
+            [self.measure(f'/api/recipes/?cursor=&limit={size}', size)
+             for size in (6, 30)],
+            [self.CURSOR_QUERIES] * 2)
+
+
+class MembershipCacheTest(APITestCase):
+
+    def test_flags_follow_writes(self):
+        recipe = self.create_recipe(self.create_user('author'))
+        url = f'/api/recipes/{recipe.id}/'
+        self.assertFalse(self.client.get(url).data['is_favorited'])
+        self.client.post(f'/api/recipes/{recipe.id}/favorite/')
+        self.assertTrue(self.client.get(url).data['is_favorited'])
+        self.client.delete(f'/api/recipes/{recipe.id}/favorite/')
+        self.assertFalse(self.client.get(url).data['is_favorited'])
+
+
+class ImageUploadTest(APITestCase):
+
+    def get_payload(self, image):
+        return {
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 5}
+                for ingredient in self.ingredients
+            ],
+            'name': 'Рецепт с картинкой',
+            'image': image,
+            'text': 'Описание',
+            'cooking_time': 10,
+        }
+
+    def test_line_wrapped_base64(self):
+        image = 'data:image/png;base64,' + base64.encodebytes(
+            PNG * 3).decode()
+        with patch.object(constants, 'BASE64_CHUNK_SIZE', 10):
+            response = self.client.post(
+                '/api/recipes/', self.get_payload(image), format='json')
+            decoded = b''.join(decode_base64(image, image.index(',') + 1))
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(decoded, PNG * 3)
+
+    def test_rejects_large_body_before_reading(self):
+        image = 'data:image/png;base64,' + base64.b64encode(PNG).decode()
+        with patch('api.parsers.MAX_JSON_BODY_SIZE', 100):
+            response = self.client.post(
+                '/api/recipes/', self.get_payload(image), format='json')
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Recipe.objects.exists())
+
+
+class CountersTest(APITestCase):
+
+    def test_counters_follow_favorites_and_cart(self):
+        recipe = self.create_recipe(self.create_user('author'))
+        for action, field in (('favorite', 'favorites_count'),
+                              ('shopping_cart', 'in_carts_count')):
+            url = f'/api/recipes/{recipe.id}/{action}/'
+            self.client.post(url)
+            recipe.refresh_from_db()
+            self.assertEqual(getattr(recipe, field), 1)
+            self.client.delete(url)
+            recipe.refresh_from_db()
+            self.assertEqual(getattr(recipe, field), 0)
+
+    def test_ordering_by_counters_needs_page_numbers(self):
+        author = self.create_user('author')
+        popular = self.create_recipe(author)
+        self.create_recipe(author)
+        self.client.post(f'/api/recipes/{popular.id}/favorite/')
+        response = self.client.get('/api/recipes/?ordering=-favorites_count')
+        self.assertEqual(response.data['results'][0]['id'], popular.id)
+        response = self.client.get(
+            '/api/recipes/?cursor=&ordering=-favorites_count')
+        self.assertEqual(response.status_code, 400)
+
+    def test_subscriptions_ignore_recipe_ordering(self):
+        author = self.create_user('author')
+        Subscription.objects.create(user=self.user, author=author)
+        response = self.client.get(
+            '/api/users/subscriptions/?cursor=&ordering=-favorites_count')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [user['id'] for user in response.data['results']], [author.id])
+
+
+class BulkMembershipTest(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        author = self.create_user('author')
+        self.recipes = [self.create_recipe(author) for _ in range(20)]
+
+    def unlink(self, url, ids):
+        self.client.post(url, {'ids': ids}, format='json')
+        response, queries = self.count_queries(
+            'delete', url, data={'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {row['status'] for row in response.data}, {'deleted'})
+
+        return queries
+
+    def test_delete_queries_do_not_depend_on_ids(self):
+        ids = [recipe.id for recipe in self.recipes]
+        for url in ('/api/recipes/favorite/', '/api/recipes/shopping_cart/'):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.unlink(url, ids[:5]), self.unlink(url, ids))
+
+    def test_delete_updates_aggregates(self):
+        ids = [recipe.id for recipe in self.recipes]
+        self.client.post(
+            '/api/recipes/shopping_cart/', {'ids': ids}, format='json')
+        self.client.delete(
+            '/api/recipes/shopping_cart/', {'ids': ids[:5]}, format='json')
+        self.assertEqual(
+            dict(ShoppingListItem.objects.filter(
+                user=self.user).values_list('ingredient_id', 'amount')),
+            {ingredient.id: amount * 15
+             for ingredient, amount in zip(self.ingredients, (1, 2, 3))})
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('in_carts_count', flat=True)),
+            [0] * 5 + [1] * 15)
+        response = self.client.get('/api/recipes/?is_in_shopping_cart=1')
+        self.assertEqual(response.data['count'], 15)
+
+    def assert_aggregates_consistent(self):
+        self.assertEqual(
+            get_stored_shopping_lists(), compute_shopping_lists())
+        for recipe in Recipe.objects.all():
+            self.assertEqual(
+                recipe.in_carts_count,
+                ShoppingCart.objects.filter(recipe=recipe).count())
+
+    def test_rows_written_concurrently_are_not_counted_twice(self):
+        recipe = self.recipes[0]
+        url = '/api/recipes/shopping_cart/'
+
+        def add_first(model, instances, field):
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+            return insert_returning(model, instances, field)
+
+        def remove_first(model, user, field, ids):
+            ShoppingCart.objects.filter(user=user, recipe=recipe).delete()
+            return delete_returning(model, user, field, ids)
+
+        with patch('api.bulk.insert_returning', add_first):
+            response = self.client.post(
+                url, {'ids': [recipe.id]}, format='json')
+        self.assertEqual(response.data[0]['status'], 'exists')
+        self.assert_aggregates_consistent()
+        with patch('api.bulk.delete_returning', remove_first):
+            response = self.client.delete(
+                url, {'ids': [recipe.id]}, format='json')
+        self.assertEqual(response.data[0]['status'], 'missing')
+        self.assert_aggregates_consistent()
+
+
+class ShoppingListTest(APITestCase):
+
+    def test_list_follows_cart_and_recipe_edits(self):
+        author = self.create_user('author')
+        recipe = self.create_recipe(author)
+        self.create_recipe(author)
+        self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.get_client(author).patch(f'/api/recipes/{recipe.id}/', {
+            'ingredients': [
+                {'id': self.ingredients[0].id, 'amount': 5},
+                {'id': self.ingredients[1].id, 'amount': 2},
+            ],
+        }, format='json')
+        self.assertEqual(
+            get_stored_shopping_lists([self.user.id]),
+            {(self.user.id, self.ingredients[0].id): 5,
+             (self.user.id, self.ingredients[1].id): 2})
+        self.assertEqual(
+            get_stored_shopping_lists(),
+            compute_shopping_lists())
+        recipe.delete()
+        self.assertEqual(get_stored_shopping_lists(), {})
+
+    def test_download_through_asgi(self):
+        recipe = self.create_recipe(self.create_user('author'))
+        self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        for export_format in ('txt', 'csv', 'json'):
+            with self.subTest(export_format=export_format):
+                status, body = self.asgi_get(
+                    self.user, '/api/recipes/download_shopping_cart/',
+                    f'format={export_format}')
+                self.assertEqual(status, 200)
+                self.assertIn(
+                    self.ingredients[2].name, body.decode())
+
+
+class FeedTest(APITestCase):
+
+    def get_feed(self):
+        response = self.client.get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 200)
+
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_feed_follows_subscriptions(self):
+        author = self.create_user('author')
+        old = self.create_recipe(author)
+        self.create_recipe(self.create_user('stranger'))
+        self.client.post(f'/api/users/{author.id}/subscribe/')
+        self.assertEqual(self.get_feed(), [old.id])
+        response = self.get_client(author).post('/api/recipes/', {
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [{'id': self.ingredients[0].id, 'amount': 1}],
+            'name': 'Новый рецепт',
+            'image': 'data:image/png;base64,'
+                     + base64.b64encode(PNG).decode(),
+            'text': 'Описание',
+            'cooking_time': 10,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.get_feed(), [response.data['id'], old.id])
+        self.client.delete(f'/api/users/{author.id}/subscribe/')
+        self.assertEqual(self.get_feed(), [])
+
+
+class CatalogueCacheTest(APITestCase):
+
+    def bump_elsewhere(self):
+        """What load_ingredients leaves behind when run in its own process."""
+        Ingredient.objects.bulk_create(
+            [Ingredient(name='new ingredient', measurement_unit='г')])
+        CatalogueVersion.objects.filter(
+            label=Ingredient._meta.label_lower).update(version='loaded')
+
+    def test_list_follows_version_from_other_process(self):
+        response = self.client.get('/api/ingredients/')
+        self.assertEqual(len(response.data), 3)
+        self.bump_elsewhere()
+        second = self.client.get('/api/ingredients/')
+        self.assertEqual(len(second.data), 4)
+        self.assertNotEqual(second['ETag'], response['ETag'])
+
+    def test_autocomplete_follows_version_from_other_process(self):
+        url = '/api/ingredients/?name=new'
+        self.assertEqual(self.client.get(url).data, [])
+        self.bump_elsewhere()
+        self.assertEqual(
+            [row['name'] for row in self.client.get(url).data],
+            ['new ingredient'])
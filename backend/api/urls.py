@@ -1,9 +1,10 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import (CustomUserViewSet, TagViewSet, IngredientViewSet,
                     RecipeViewSet, SubscriptionViewSet, ShoppingCartViewSet,
-                    FavoriteRecipeViewSet)
+                    FavoriteRecipeViewSet, MetricsView)
 
 app_name = 'api'
 
@@ -27,6 +28,16 @@ router_v1.register(
     basename='favorite')
 
 urlpatterns = [
+    path('_metrics/', MetricsView.as_view(), name='metrics'),
+    path('recipes/', async_views.recipe_list, name='recipes-list'),
+    path('recipes/<int:pk>/', async_views.recipe_detail,
+         name='recipes-detail'),
+    path('tags/', async_views.tag_list, name='tags-list'),
+    path('tags/<int:pk>/', async_views.tag_detail, name='tags-detail'),
+    path('ingredients/', async_views.ingredient_list,
+         name='ingredients-list'),
+    path('ingredients/<int:pk>/', async_views.ingredient_detail,
+         name='ingredients-detail'),
     path('', include(router_v1.urls)),
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
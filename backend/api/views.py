@@ -1,39 +1,61 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from djoser.serializers import SetPasswordSerializer
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.permissions import (IsAuthenticatedOrReadOnly,
+from rest_framework.permissions import (IsAdminUser,
+                                        IsAuthenticatedOrReadOnly,
                                         IsAuthenticated, SAFE_METHODS)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ReadOnlyModelViewSet, ModelViewSet
 
-from recipes.models import Tag, Ingredient, Recipe, ShoppingCart, Favorites
+from core.constants import INGREDIENT_SEARCH_LIMIT
+from core.profiling import metrics
+from recipes.feed import get_feed
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (Tag, Ingredient, Recipe, ShoppingCart, Favorites,
+                            ShoppingListItem)
 from .filters import IngredientFilter, TagFilter, RecipeFilter
-from .mixins import CreateDeleteViewSet
+from .mixins import (BulkMembershipMixin, CatalogueCacheMixin,
+                     CreateDeleteViewSet, CursorPaginationMixin,
+                     EagerLoadingViewSetMixin)
+from .pagination import (FeedCursorPagination, RecipeCursorPagination,
+                         SubscriptionCursorPagination)
 from .permissions import IsOwnerOrReadOnly
+from .renderers import (CSVRenderer, FastJSONRenderer, PlainTextRenderer,
+                        PrometheusRenderer)
 from .serializers import (SubscriptionSerializer, TagSerializer,
                           IngredientSerializer, RecipeListSerializer,
                           RecipeEditSerializer, UserListSerializer,
                           ShoppingCartSerializer, FavoriteRecipeSerializer,
-                          CreateUserSerializer)
+                          CreateUserSerializer, ShoppingListItemSerializer)
+from .shopping_list import stream_shopping_list
 from users.models import Subscription
 
 User = get_user_model()
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(BulkMembershipMixin, CursorPaginationMixin,
+                        EagerLoadingViewSetMixin, UserViewSet):
     queryset = User.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly,)
 
+    def get_cursor_pagination_class(self):
+        if self.action == 'subscriptions':
+            return SubscriptionCursorPagination
+
+        return super().get_cursor_pagination_class()
+
     def get_serializer_class(self):
         if self.action == 'set_password':
             return SetPasswordSerializer
         if self.action == 'create':
             return CreateUserSerializer
+        if self.action == 'subscriptions':
+            return SubscriptionSerializer
 
         return UserListSerializer
 
@@ -47,21 +69,31 @@ class CustomUserViewSet(UserViewSet):
         detail=False,
         permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
-        queryset = Subscription.objects.filter(user=request.user)
+        queryset = self.setup_eager_loading(
+            Subscription.objects.filter(user=request.user).order_by(
+                *Subscription._meta.ordering))
         pages = self.paginate_queryset(queryset)
-        serializer = SubscriptionSerializer(
-            pages,
-            many=True,
-            context={'request': request},)
+        serializer = self.get_serializer(pages, many=True)
 
         return self.get_paginated_response(serializer.data)
 
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        url_path='subscribe',
+        permission_classes=(IsAuthenticated,))
+    def bulk_subscribe(self, request):
+        return self.bulk_membership(
+            request, Subscription, 'author',
+            User.objects.exclude(id=request.user.id))
+
 
-class SubscriptionViewSet(CreateDeleteViewSet):
+class SubscriptionViewSet(EagerLoadingViewSetMixin, CreateDeleteViewSet):
     serializer_class = SubscriptionSerializer
 
     def get_queryset(self):
-        return self.user.subscriptions.all()
+        return self.setup_eager_loading(
+            self.request.user.subscriptions.all())
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -80,21 +112,17 @@ class SubscriptionViewSet(CreateDeleteViewSet):
 
     @action(methods=('delete',), detail=True)
     def delete(self, request, user_id):
-        get_object_or_404(User, id=user_id)
-        if not Subscription.objects.filter(
-                user=request.user, author_id=user_id).exists():
+        deleted, _ = request.user.subscriptions.filter(
+            author_id=user_id).delete()
+        if not deleted:
+            get_object_or_404(User, id=user_id)
             return Response({'errors': 'На этого автора не было подписки'},
                             status=status.HTTP_400_BAD_REQUEST)
-        get_object_or_404(
-            Subscription,
-            user=request.user,
-            author_id=user_id
-        ).delete()
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogueCacheMixin, ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
@@ -102,8 +130,18 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     search_fields = ('^name', )
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+
+        limit = request.query_params.get('limit', '')
+        limit = int(limit) if limit.isdigit() else INGREDIENT_SEARCH_LIMIT
 
-class TagViewSet(ReadOnlyModelViewSet):
+        return Response(ingredient_index.search(name, limit or None))
+
+
+class TagViewSet(CatalogueCacheMixin, ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
@@ -111,10 +149,18 @@ class TagViewSet(ReadOnlyModelViewSet):
     filterset_class = TagFilter
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(BulkMembershipMixin, CursorPaginationMixin,
+                    EagerLoadingViewSetMixin, ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly)
     filterset_class = RecipeFilter
+    cursor_pagination_class = RecipeCursorPagination
+
+    def get_cursor_pagination_class(self):
+        if self.action == 'feed':
+            return FeedCursorPagination
+
+        return super().get_cursor_pagination_class()
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
@@ -129,44 +175,75 @@ class RecipeViewSet(ModelViewSet):
         detail=False,
         methods=('get',),
         url_path='download_shopping_cart',
-        pagination_class=None)
+        pagination_class=None,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(PlainTextRenderer, CSVRenderer, FastJSONRenderer))
     def download_file(self, request):
         user = request.user
         if not user.shopping_cart.exists():
             return Response(
                 'Корзина товаров пуста', status=status.HTTP_400_BAD_REQUEST)
 
-        text = 'Список необходимых ингредиентов:\n\n'
-        ingredient_name = 'recipe__recipe__ingredient__name'
-        ingredient_unit = 'recipe__recipe__ingredient__measurement_unit'
-        recipe_amount = 'recipe__recipe__amount'
-        amount_sum = 'recipe__recipe__amount__sum'
-        cart = user.shopping_cart.select_related('recipe').values(
-            ingredient_name, ingredient_unit
-        ).annotate(Sum(recipe_amount)).order_by(ingredient_name)
-        for _ in cart:
-            text += (
-                f'{_[ingredient_name]} ({_[ingredient_unit]})'
-                f' — {_[amount_sum]}\n'
-            )
-        response = HttpResponse(text, content_type='text/plain')
-        filename = 'shopping_list.txt'
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            stream_shopping_list(user, renderer.format),
+            content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        filename = f'shopping_list.{renderer.format}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
 
         return response
 
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        queryset = self.filter_queryset(
+            self.setup_eager_loading(get_feed(request.user)))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
 
-class ShoppingCartViewSet(CreateDeleteViewSet):
-    serializer_class = ShoppingCartSerializer
+        return self.get_paginated_response(serializer.data)
 
-    def get_queryset(self):
-        return self.request.user.shopping_cart.all()
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        url_path='shopping_cart',
+        permission_classes=(IsAuthenticated,))
+    def bulk_shopping_cart(self, request):
+        return self.bulk_membership(
+            request, ShoppingCart, 'recipe', Recipe.objects.all())
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context['recipe_id'] = self.kwargs.get('recipe_id')
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        url_path='favorite',
+        permission_classes=(IsAuthenticated,))
+    def bulk_favorite(self, request):
+        return self.bulk_membership(
+            request, Favorites, 'recipe', Recipe.objects.all())
 
-        return context
+    @action(
+        detail=False,
+        methods=('get',),
+        url_path='shopping_list',
+        pagination_class=None,
+        permission_classes=(IsAuthenticated,))
+    def shopping_list(self, request):
+        items = ShoppingListItem.objects.filter(
+            user=request.user
+        ).select_related('ingredient').order_by('ingredient__name')
+
+        return Response(ShoppingListItemSerializer(items, many=True).data)
+
+
+class ShoppingCartViewSet(EagerLoadingViewSetMixin, CreateDeleteViewSet):
+    serializer_class = ShoppingCartSerializer
+
+    def get_queryset(self):
+        return self.setup_eager_loading(
+            self.request.user.shopping_cart.all())
 
     def perform_create(self, serializer):
         serializer.save(
@@ -176,31 +253,20 @@ class ShoppingCartViewSet(CreateDeleteViewSet):
 
     @action(methods=('delete',), detail=True)
     def delete(self, request, recipe_id):
-        user = request.user
-        if not user.shopping_cart.select_related('recipe').filter(
-                recipe_id=recipe_id
-        ).exists():
+        deleted, _ = request.user.shopping_cart.filter(
+            recipe_id=recipe_id).delete()
+        if not deleted:
             return Response({'errors': 'Такого рецепта нет в корзине'},
                             status=status.HTTP_400_BAD_REQUEST)
-        get_object_or_404(
-            ShoppingCart,
-            user=request.user,
-            recipe=recipe_id).delete()
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class FavoriteRecipeViewSet(CreateDeleteViewSet):
+class FavoriteRecipeViewSet(EagerLoadingViewSetMixin, CreateDeleteViewSet):
     serializer_class = FavoriteRecipeSerializer
 
     def get_queryset(self):
-        return self.request.user.favorites.all()
-
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context['recipe_id'] = self.kwargs.get('recipe_id')
-
-        return context
+        return self.setup_eager_loading(self.request.user.favorites.all())
 
     def perform_create(self, serializer):
         serializer.save(
@@ -212,12 +278,18 @@ class FavoriteRecipeViewSet(CreateDeleteViewSet):
 
     @action(methods=('delete',), detail=True)
     def delete(self, request, recipe_id):
-        if not request.user.favorites.filter(recipe_id=recipe_id).exists():
+        deleted, _ = request.user.favorites.filter(
+            recipe_id=recipe_id).delete()
+        if not deleted:
             return Response({'errors': 'Этого рецепта и так нет в избранном'},
                             status=status.HTTP_400_BAD_REQUEST)
-        get_object_or_404(
-            Favorites,
-            user=request.user,
-            recipe_id=recipe_id).delete()
 
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class MetricsView(APIView):
+    permission_classes = (IsAdminUser,)
+    renderer_classes = (FastJSONRenderer, PrometheusRenderer)
+
+    def get(self, request):
+        return Response(metrics.snapshot())
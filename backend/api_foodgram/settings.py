@@ -19,6 +19,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'rest_framework',
     'rest_framework.authtoken',
@@ -39,8 +40,12 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.profiling.ProfilingMiddleware',
 ]
 
+# Query counts and timings per view action, see /api/_metrics/
+PROFILING = config('PROFILING', default=False, cast=bool)
+
 ROOT_URLCONF = 'api_foodgram.urls'
 
 TEMPLATES = [
@@ -69,15 +74,42 @@ WSGI_APPLICATION = 'api_foodgram.wsgi.application'
 #     }
 # }
 
-# postgresql
+# postgresql, core.postgresql adds health checks and the pool,
+# max_size 0 turns the pool off
+DB_POOL = {
+    'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+    'max_size': config('DB_POOL_MAX_SIZE', default=0, cast=int),
+    'timeout': config('DB_POOL_TIMEOUT', default=30, cast=int),
+    'max_idle': config('DB_POOL_MAX_IDLE', default=600, cast=int),
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': config('ENGINE', default='django.db.backends.postgresql'),
+        'ENGINE': config('ENGINE', default='core.postgresql'),
         'NAME': config('NAME', default='postgres'),
         'USER': config('USER', default='postgres'),
         'PASSWORD': config('PASSWORD', default='postgres'),
         'HOST': config('HOST', default='db'),
         'PORT': config('PORT', default='5432'),
+        # The pool keeps connections itself, requests return them at once.
+        'CONN_MAX_AGE': config(
+            'CONN_MAX_AGE', default=0 if DB_POOL['max_size'] else 60,
+            cast=int),
+        'CONN_HEALTH_CHECKS': config(
+            'CONN_HEALTH_CHECKS', default=True, cast=bool),
+    }
+}
+
+if DB_POOL['max_size']:
+    DATABASES['default']['OPTIONS'] = {'pool': DB_POOL}
+
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': config('CACHE_LOCATION', default='foodgram'),
     }
 }
 
@@ -103,7 +135,16 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
@@ -137,3 +178,10 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Uploads above this size are spooled to a temporary file
+FILE_UPLOAD_MAX_MEMORY_SIZE = config(
+    'FILE_UPLOAD_MAX_MEMORY_SIZE', default=1024 * 1024, cast=int)
+
+# 0 renders thumbnails in the request thread
+IMAGE_WORKERS = config('IMAGE_WORKERS', default=2, cast=int)
@@ -1,6 +1,10 @@
 # settings.py
 MAX_ELEMS_ON_PAGE = 6
 
+# core.profiling.py
+PROFILING_WINDOW = 1000
+PROFILING_QUANTILES = (0.5, 0.95, 0.99)
+
 # users.models.py
 MAX_LEN_EMAIL = 254
 MAX_LEN_USERNAME = 150
@@ -12,3 +16,52 @@ MAX_LEN_MEASUREMENT_UNIT = 40
 MIN_COOKING_VALUE = 1
 MAX_COOKING_VALUE = 300
 MIN_INGREDIENT_AMOUNT = 1
+MAX_LEN_CATALOGUE_LABEL = 100
+CATALOGUE_VERSION_LENGTH = 32
+
+# recipes.management.commands.load_ingredients.py
+INGREDIENTS_BATCH_SIZE = 1000
+JSON_READ_CHUNK_SIZE = 64 * 1024
+
+# api.membership.py
+MEMBERSHIP_CACHE_TIMEOUT = 60 * 60
+
+# api.authentication.py
+AUTH_TOKEN_CACHE_TIMEOUT = 5 * 60
+
+# recipes.catalogue.py
+CATALOGUE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# recipes.ingredient_index.py
+INGREDIENT_SEARCH_LIMIT = 50
+
+# recipes.search.py
+SEARCH_CONFIG = 'russian'
+
+# recipes.feed.py
+FEED_FANOUT_LIMIT = 1000
+FEED_BACKFILL_SIZE = 100
+FEED_BATCH_SIZE = 1000
+FEED_PULL_AUTHORS_TIMEOUT = 5 * 60
+
+# api.pagination.py
+MAX_PAGE_SIZE = 100
+
+# api.serializers.py
+MIN_LEN_RECIPE_NAME = 4
+MAX_BULK_IDS = 100
+BASE64_CHUNK_SIZE = 64 * 1024
+
+# recipes.images.py
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+MAX_IMAGE_SIDE = 4096
+THUMBNAIL_SIZES = {
+    'small': (320, 320),
+    'medium': (640, 640),
+}
+THUMBNAIL_QUALITY = 80
+ORIGINAL_QUALITY = 90
+
+# api.parsers.py
+# a base64 image grows by a third, the rest of the recipe fits in a MiB
+MAX_JSON_BODY_SIZE = MAX_IMAGE_SIZE * 4 // 3 + 1024 * 1024
@@ -0,0 +1,198 @@
+"""PostgreSQL backend with connection health checks and an optional pool.
+
+``CONN_HEALTH_CHECKS`` backports the Django 4.1 setting: a persistent
+connection is pinged before its first use in a request and replaced if
+the server dropped it. ``OPTIONS['pool']`` shares connections between
+the threads of a process: ``min_size`` connections are opened with the
+first one and always kept, up to ``max_size`` stay open between requests
+until they are idle for ``max_idle`` seconds, and ``timeout`` is how long
+to wait for a free one. With health checks a connection taken from the
+pool is pinged once per request, not on every checkout.
+"""
+from collections import deque
+from functools import partial
+from threading import BoundedSemaphore, Lock
+from time import monotonic
+
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.postgresql import base
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+Database = base.Database
+
+pools = {}
+pools_lock = Lock()
+
+
+class ConnectionPool:
+    """Idle connections shared by the threads of one process.
+
+    Released connections stay open, at most ``max_size`` of them; the
+    ones idle for longer than ``max_idle`` seconds are closed down to
+    ``min_size``.
+    """
+
+    def __init__(self, min_size=0, max_size=10, timeout=30, max_idle=600):
+        # (released at, connection), the oldest on the left
+        self.idle = deque()
+        self.lock = Lock()
+        self.slots = BoundedSemaphore(max_size)
+        self.min_size = min_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.filled = False
+
+    def fill(self, connect):
+        """Open ``min_size`` idle connections once, on the first acquire."""
+        with self.lock:
+            if self.filled:
+                return
+            self.filled = True
+            missing = self.min_size - len(self.idle)
+        for _ in range(missing):
+            connection = connect()
+            with self.lock:
+                self.idle.append((monotonic(), connection))
+
+    def acquire(self, connect):
+        """Return a connection and whether it was taken from the idle ones."""
+        if not self.slots.acquire(timeout=self.timeout):
+            raise Database.OperationalError(
+                f'Нет свободного соединения в пуле за {self.timeout} с')
+        try:
+            if not self.filled:
+                self.fill(connect)
+            with self.lock:
+                if self.idle:
+                    return self.idle.pop()[1], True
+
+            return connect(), False
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def release(self, connection):
+        try:
+            if (not connection.closed
+                    and connection.info.transaction_status
+                    != TRANSACTION_STATUS_IDLE):
+                connection.rollback()
+        except Database.Error:
+            connection.close()
+        try:
+            if not connection.closed:
+                with self.lock:
+                    self.idle.append((monotonic(), connection))
+        finally:
+            self.slots.release()
+        self.close_expired()
+
+    def close_expired(self):
+        deadline = monotonic() - self.max_idle
+        expired = []
+        with self.lock:
+            while (len(self.idle) > self.min_size
+                    and self.idle[0][0] < deadline):
+                expired.append(self.idle.popleft()[1])
+        for connection in expired:
+            connection.close()
+
+    def close(self):
+        """Close the idle connections."""
+        with self.lock:
+            idle, self.idle = self.idle, deque()
+        for _, connection in idle:
+            connection.close()
+
+
+def get_pool(alias, options):
+    if alias in pools:
+        return pools[alias]
+    with pools_lock:
+        if alias not in pools:
+            pools[alias] = ConnectionPool(**options)
+
+        return pools[alias]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    health_check_done = False
+    reused_from_pool = False
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pool(self):
+        options = self.settings_dict['OPTIONS'].get('pool')
+        if not options:
+            return None
+
+        return get_pool(self.alias, options)
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+
+        return params
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connection, self.reused_from_pool = pool.acquire(
+            partial(super().get_new_connection, conn_params))
+        self.isolation_level = connection.isolation_level
+
+        return connection
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.release(self.connection)
+
+    def connect(self):
+        super().connect()
+        # An idle pooled connection is pinged at most once per request,
+        # by the first cursor unless one was checked earlier.
+        if not self.reused_from_pool:
+            self.health_check_done = True
+
+    def close_if_health_check_failed(self):
+        if (self.connection is None
+                or not self.health_check_enabled
+                or self.health_check_done
+                or self.in_atomic_block):
+            return
+        if not self.is_usable():
+            # Closed first, so the pool does not take it back.
+            self.connection.close()
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+
+        return super()._cursor(name)
+
+
+def reset_health_checks(**kwargs):
+    """Check connections again in the next request, as Django 4.1 does.
+
+    Not done in ``close_if_unusable_or_obsolete()``: the async views call
+    it around every query in a worker thread.
+    """
+    for connection in connections.all():
+        if isinstance(connection, DatabaseWrapper):
+            connection.health_check_done = False
+
+
+for signal in (request_started, request_finished):
+    signal.connect(
+        reset_health_checks,
+        dispatch_uid=f'postgresql_health_checks_{signal}',
+    )
@@ -0,0 +1,194 @@
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .constants import PROFILING_QUANTILES, PROFILING_WINDOW
+
+METRICS = {
+    'duration': ('request_duration_seconds', 'Время обработки запроса'),
+    'db': ('db_duration_seconds', 'Время SQL-запросов'),
+    'serialize': ('serialize_duration_seconds', 'Время рендеринга ответа'),
+    'queries': ('db_queries', 'Количество SQL-запросов'),
+    'size': ('response_bytes', 'Размер ответа'),
+}
+
+
+def percentile(values, quantile):
+    """Nearest-rank percentile of sorted ``values``."""
+    index = max(0, min(len(values) - 1, round(quantile * len(values)) - 1))
+
+    return values[index]
+
+
+class Metrics:
+    """Rolling samples of the last requests of every view action."""
+
+    def __init__(self, window):
+        self.lock = Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+        self.counts = defaultdict(int)
+        self.sums = defaultdict(lambda: dict.fromkeys(METRICS, 0))
+
+    def record(self, key, sample):
+        with self.lock:
+            self.samples[key].append(sample)
+            self.counts[key] += 1
+            for metric, value in sample.items():
+                self.sums[key][metric] += value or 0
+
+    def snapshot(self):
+        with self.lock:
+            samples = {
+                key: list(values) for key, values in self.samples.items()}
+            counts = dict(self.counts)
+            sums = {key: dict(values) for key, values in self.sums.items()}
+        snapshot = []
+        for (method, view), rows in sorted(samples.items()):
+            entry = {
+                'method': method,
+                'view': view,
+                'count': counts[(method, view)],
+            }
+            for metric in METRICS:
+                values = sorted(
+                    row[metric] for row in rows if row[metric] is not None)
+                entry[metric] = {
+                    'sum': sums[(method, view)][metric],
+                    **{
+                        f'p{round(quantile * 100)}': (
+                            percentile(values, quantile) if values else None)
+                        for quantile in PROFILING_QUANTILES
+                    },
+                }
+            snapshot.append(entry)
+
+        return snapshot
+
+
+metrics = Metrics(PROFILING_WINDOW)
+
+
+def format_prometheus(snapshot):
+    lines = []
+    for metric, (name, help_text) in METRICS.items():
+        name = f'foodgram_{name}'
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} summary')
+        for entry in snapshot:
+            labels = f'method="{entry["method"]}",view="{entry["view"]}"'
+            for quantile in PROFILING_QUANTILES:
+                value = entry[metric][f'p{round(quantile * 100)}']
+                if value is not None:
+                    lines.append(
+                        f'{name}{{{labels},quantile="{quantile}"}} {value}')
+            lines.append(f'{name}_sum{{{labels}}} {entry[metric]["sum"]}')
+            lines.append(f'{name}_count{{{labels}}} {entry["count"]}')
+
+    return '\n'.join(lines) + '\n'
+
+
+class QueryTimer:
+    """Database execute wrapper counting queries and their time."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self.lock:
+                self.count += 1
+                self.duration += perf_counter() - started
+
+
+current_timer = ContextVar('current_timer', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    timer = current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection, **kwargs):
+    # First in the list, execute_wrapper() pops the last wrapper on exit.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+connection_created.connect(
+    install_query_recorder, dispatch_uid='profiling_query_recorder')
+
+
+@contextmanager
+def track_queries():
+    """Time the queries of the block, sync_to_async threads included.
+
+    The timer lives in a context variable, which asgiref copies into the
+    threads running the ORM calls of the async views.
+    """
+    for connection in connections.all():
+        install_query_recorder(connection)
+    timer = QueryTimer()
+    token = current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        current_timer.reset(token)
+
+
+class ProfilingMiddleware:
+    """Per view action query counts and timings, enabled by PROFILING."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = perf_counter()
+        with track_queries() as timer:
+            response = self.get_response(request)
+        duration = perf_counter() - started
+
+        serialize = getattr(request, '_serialize_duration', 0.0)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={timer.duration * 1000:.1f};desc="{timer.count} SQL"',
+            f'serialize;dur={serialize * 1000:.1f}',
+            f'app;dur={(duration - timer.duration - serialize) * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ))
+        match = request.resolver_match
+        if match is not None:
+            metrics.record((request.method, match.view_name), {
+                'duration': duration,
+                'db': timer.duration,
+                'serialize': serialize,
+                'queries': timer.count,
+                'size': None if response.streaming else len(response.content),
+            })
+
+        return response
+
+    def process_template_response(self, request, response):
+        started = perf_counter()
+
+        def finish(response):
+            request._serialize_duration = perf_counter() - started
+
+        response.add_post_render_callback(finish)
+
+        return response
@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+# bulk_create() skips post_save. Sent after a batch of favorites, cart
+# rows or subscriptions is created, with ``user_id`` and ``ids`` of the
+# linked recipes or authors.
+memberships_created = Signal()
+# The bulk delete skips pre_delete and post_delete. Sent after a batch of
+# such rows is deleted, with the same arguments.
+memberships_deleted = Signal()
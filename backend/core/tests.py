@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from .postgresql.base import ConnectionPool
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = 0
+        self.info = SimpleNamespace(transaction_status=TRANSACTION_STATUS_IDLE)
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def setUp(self):
+        self.opened = []
+        self.pool = ConnectionPool(min_size=2, max_size=8, max_idle=600)
+
+    def connect(self):
+        connection = FakeConnection()
+        self.opened.append(connection)
+
+        return connection
+
+    def run_hops(self, hops):
+        connections = [self.pool.acquire(self.connect)[0] for _ in range(hops)]
+        for connection in connections:
+            self.pool.release(connection)
+
+    def test_first_acquire_opens_min_size(self):
+        connection, reused = self.pool.acquire(self.connect)
+        self.assertTrue(reused)
+        self.assertEqual(len(self.opened), 2)
+        self.assertEqual(len(self.pool.idle), 1)
+
+    def test_concurrent_hops_reuse_released_connections(self):
+        self.run_hops(4)
+        self.run_hops(4)
+        self.assertEqual(len(self.opened), 4)
+        self.assertEqual(len(self.pool.idle), 4)
+        self.assertFalse(any(connection.closed for connection in self.opened))
+
+    def test_idle_connections_shrink_to_min_size(self):
+        self.run_hops(4)
+        with patch('core.postgresql.base.monotonic', return_value=10 ** 9):
+            self.run_hops(1)
+        self.assertEqual(len(self.pool.idle), 2)
+        self.assertEqual(
+            sum(connection.closed for connection in self.opened), 2)
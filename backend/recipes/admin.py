@@ -3,11 +3,19 @@ from django.contrib.admin import register, TabularInline
 
 from .models import (AmountIngredient, Favorites, Ingredient, Recipe,
                      ShoppingCart, Tag)
+from .shopping_list import rebuild_recipe_carts
 
 
 @register(AmountIngredient)
 class AmountIngredientAdmin(admin.ModelAdmin):
-    pass
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        rebuild_recipe_carts(obj.recipe_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rebuild_recipe_carts(obj.recipe_id)
 
 
 class IngredientInline(TabularInline):
@@ -37,6 +45,7 @@ class IngredientAdmin(admin.ModelAdmin):
 class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'name', 'author', 'get_ingredients', 'favorites_count',
+        'in_carts_count',
     )
     search_fields = ('name', 'text')
     list_filter = (
@@ -44,14 +53,14 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     inlines = (IngredientInline,)
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if change:
+            rebuild_recipe_carts(form.instance.id)
+
     def get_ingredients(self, obj):
         return [ingredient.name for ingredient in obj.ingredients.all()]
 
-    def favorites_count(self, obj):
-        return obj.in_favorites.count()
-
-    favorites_count.short_description = 'Добавили в избранное'
-
 
 @register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
@@ -0,0 +1,20 @@
+from uuid import uuid4
+
+from .models import CatalogueVersion
+
+
+def get_catalogue_version(model):
+    """Version of the model's rows, changed by every write to them.
+
+    Kept in the database: the cache may be local to a process, while
+    load_ingredients and seed_data run in processes of their own.
+    """
+    version, _ = CatalogueVersion.objects.get_or_create(
+        label=model._meta.label_lower, defaults={'version': uuid4().hex})
+
+    return version.version
+
+
+def bump_catalogue_version(model):
+    CatalogueVersion.objects.update_or_create(
+        label=model._meta.label_lower, defaults={'version': uuid4().hex})
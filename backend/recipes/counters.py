@@ -0,0 +1,29 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Favorites, Recipe, ShoppingCart
+
+COUNTERS = {
+    Favorites: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+
+def change_counter(model, recipe_ids, delta):
+    field = COUNTERS[model]
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        **{field: Greatest(F(field) + delta, 0)})
+
+
+def get_actual_counts():
+    """Counter expressions recounted from the relation tables."""
+    return {
+        field: Coalesce(Subquery(
+            model.objects.filter(
+                recipe=OuterRef('pk')
+            ).order_by().values('recipe').annotate(
+                count=Count('id')
+            ).values('count')
+        ), 0)
+        for model, field in COUNTERS.items()
+    }
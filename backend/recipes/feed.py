@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from core.constants import (FEED_BACKFILL_SIZE, FEED_BATCH_SIZE,
+                            FEED_FANOUT_LIMIT, FEED_PULL_AUTHORS_TIMEOUT)
+from users.models import Subscription
+from .models import FeedEntry, Recipe
+
+PULL_AUTHORS_KEY = 'feed:pull_authors'
+
+
+def load_pull_authors():
+    return frozenset(Subscription.objects.values('author').annotate(
+        subscribers=Count('id')
+    ).filter(
+        subscribers__gt=FEED_FANOUT_LIMIT
+    ).values_list('author', flat=True))
+
+
+def get_pull_authors():
+    """Authors with too many subscribers to copy their recipes to feeds.
+
+    Their recipes are read from the recipe table instead. An author who
+    drops below the limit keeps the recipes published meanwhile out of
+    the timelines until subscribers resubscribe.
+    """
+    return cache.get_or_set(
+        PULL_AUTHORS_KEY, load_pull_authors, FEED_PULL_AUTHORS_TIMEOUT)
+
+
+def fan_out(recipe):
+    if recipe.author_id in get_pull_authors():
+        return
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, recipe_id=recipe.id)
+         for user_id in Subscription.objects.filter(
+             author_id=recipe.author_id
+         ).values_list('user_id', flat=True).iterator()),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    if author_id in get_pull_authors():
+        return
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, recipe_id=recipe_id)
+         for recipe_id in Recipe.objects.filter(
+             author_id=author_id
+         ).order_by('-id').values_list('id', flat=True)[:FEED_BACKFILL_SIZE]],
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_ids):
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id__in=author_ids).delete()
+
+
+def get_feed(user):
+    """Recipes of the followed authors, newest first."""
+    pulled = list(Subscription.objects.filter(
+        user=user, author_id__in=get_pull_authors()
+    ).values_list('author_id', flat=True))
+    if not pulled:
+        return Recipe.objects.filter(in_feeds__user=user).order_by('-id')
+
+    return Recipe.objects.filter(
+        Q(id__in=FeedEntry.objects.filter(user=user).values('recipe_id'))
+        | Q(author_id__in=pulled)
+    ).order_by('-id')
@@ -0,0 +1,135 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection
+from PIL import Image, ImageOps, features
+
+from core import constants
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+THUMBNAILS_DIR = 'recipe_images/thumbnails'
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_thumbnail_prefix(image_name, size):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'{THUMBNAILS_DIR}/{stem}_{size}'
+
+
+def needs_thumbnails(recipe):
+    return bool(recipe.image) and not all(
+        getattr(recipe, f'image_{size}').name.startswith(
+            get_thumbnail_prefix(recipe.image.name, size))
+        for size in constants.THUMBNAIL_SIZES
+    )
+
+
+def encode(image, image_format, quality):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, quality=quality, optimize=True)
+
+    return buffer.getvalue()
+
+
+def make_thumbnails(recipe_id):
+    """Strip metadata from the recipe image and render its thumbnails."""
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not needs_thumbnails(recipe):
+        return
+    source = recipe.image.name
+    storage = recipe.image.storage
+    with storage.open(source, 'rb') as file:
+        image = Image.open(file)
+        original_format = image.format
+        image = ImageOps.exif_transpose(image)
+
+    # Re-encoding without ``exif`` drops EXIF, GPS and other metadata.
+    original = encode(image, original_format, constants.ORIGINAL_QUALITY)
+    thumbnail_format = 'WEBP' if features.check('webp') else 'JPEG'
+    extension = 'webp' if thumbnail_format == 'WEBP' else 'jpg'
+    thumbnails = {}
+    for size, dimensions in constants.THUMBNAIL_SIZES.items():
+        thumbnail = image.copy()
+        thumbnail.thumbnail(dimensions)
+        thumbnails[size] = encode(
+            thumbnail, thumbnail_format, constants.THUMBNAIL_QUALITY)
+
+    # The source stays in place until the recipe points at the new files.
+    saved = []
+    try:
+        image_name = storage.save(source, ContentFile(original))
+        saved.append(image_name)
+        fields = {'image': image_name}
+        for size, content in thumbnails.items():
+            fields[f'image_{size}'] = storage.save(
+                f'{get_thumbnail_prefix(image_name, size)}.{extension}',
+                ContentFile(content))
+            saved.append(fields[f'image_{size}'])
+        updated = Recipe.objects.filter(
+            pk=recipe_id, image=source).update(**fields)
+    except Exception:
+        delete_files(storage, saved)
+        raise
+    if updated:
+        delete_files(storage, [source] + [
+            getattr(recipe, f'image_{size}').name
+            for size in constants.THUMBNAIL_SIZES
+        ])
+    else:
+        # The image was replaced meanwhile, its own job handles it.
+        delete_files(storage, saved)
+
+
+def delete_files(storage, names):
+    for name in names:
+        if not name:
+            continue
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.exception('Не удалось удалить файл %s', name)
+
+
+def process_image(recipe_id):
+    try:
+        make_thumbnails(recipe_id)
+    except Exception:
+        logger.exception('Не удалось обработать изображение рецепта %s',
+                         recipe_id)
+
+
+def process_in_worker(recipe_id):
+    try:
+        process_image(recipe_id)
+    finally:
+        connection.close()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                thread_name_prefix='recipe-images',
+            )
+
+    return _executor
+
+
+def schedule_thumbnails(recipe_id):
+    if settings.IMAGE_WORKERS:
+        get_executor().submit(process_in_worker, recipe_id)
+    else:
+        process_image(recipe_id)
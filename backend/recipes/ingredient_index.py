@@ -0,0 +1,58 @@
+from bisect import bisect_left
+from threading import Lock
+
+from .catalogue import get_catalogue_version
+from .models import Ingredient
+
+
+class IngredientIndex:
+    """Sorted casefolded ingredient names for prefix lookups in memory."""
+
+    def __init__(self):
+        self.version = None
+        self.keys = []
+        self.items = []
+        self.lock = Lock()
+
+    def build(self):
+        rows = sorted(
+            Ingredient.objects.values('id', 'name', 'measurement_unit'),
+            key=lambda row: (row['name'].casefold(), row['id'])
+        )
+        self.keys = [row['name'].casefold() for row in rows]
+        self.items = rows
+
+    def refresh(self):
+        """Rebuild when the version in the database moved, whoever moved it."""
+        version = get_catalogue_version(Ingredient)
+        if version == self.version:
+            return
+        with self.lock:
+            if version != self.version:
+                self.build()
+                self.version = version
+
+    def search(self, query, limit=None):
+        """Prefix matches first, then names containing the query."""
+        self.refresh()
+        keys, items = self.keys, self.items
+        query = query.casefold()
+        found = []
+        position = bisect_left(keys, query)
+        while (position < len(keys) and keys[position].startswith(query)
+               and (limit is None or len(found) < limit)):
+            found.append(items[position])
+            position += 1
+        if limit is not None and len(found) >= limit:
+            return found
+
+        for key, item in zip(keys, items):
+            if query in key and not key.startswith(query):
+                found.append(item)
+                if limit is not None and len(found) >= limit:
+                    break
+
+        return found
+
+
+ingredient_index = IngredientIndex()
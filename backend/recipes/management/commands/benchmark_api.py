@@ -0,0 +1,168 @@
+import json
+from itertools import combinations
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from core.constants import PROFILING_QUANTILES
+from core.profiling import percentile, track_queries
+from recipes.models import Ingredient, Recipe, Tag
+from .seed_data import USERNAME_PREFIX
+
+User = get_user_model()
+
+
+def get_client(username=None):
+    user = User.objects.filter(
+        username=username or f'{USERNAME_PREFIX}0').first()
+    if user is None:
+        raise CommandError('Пользователь не найден')
+    token, _ = Token.objects.get_or_create(user=user)
+    host = next(
+        (host.lstrip('.') for host in settings.ALLOWED_HOSTS
+         if host != '*'), 'testserver')
+
+    return user, Client(
+        HTTP_HOST=host, HTTP_AUTHORIZATION=f'Token {token.key}')
+
+
+def get_cases(user):
+    recipe = Recipe.objects.order_by('-id').first()
+    tag = Tag.objects.first()
+    ingredient = Ingredient.objects.order_by('id').first()
+    if recipe is None or tag is None or ingredient is None:
+        raise CommandError(
+            'Нет данных для замеров, сначала запустите seed_data')
+    filters = {
+        'tags': f'tags={tag.slug}',
+        'author': f'author={recipe.author_id}',
+        'is_favorited': 'is_favorited=1',
+        'is_in_shopping_cart': 'is_in_shopping_cart=1',
+        'search': f'search={recipe.name.split()[0]}',
+    }
+    cases = {}
+    for size in range(len(filters) + 1):
+        for names in combinations(filters, size):
+            title = '+'.join(names) or 'all'
+            query = '&'.join(filters[name] for name in names)
+            cases[f'recipes:{title}'] = f'/api/recipes/?{query}'
+    cases.update({
+        'recipes:popular': '/api/recipes/?ordering=-favorites_count',
+        'recipes:cursor': '/api/recipes/?cursor=',
+        'recipe': f'/api/recipes/{recipe.id}/',
+        'feed': '/api/recipes/feed/',
+        'subscriptions': '/api/users/subscriptions/?recipes_limit=3',
+        'shopping_list': '/api/recipes/shopping_list/',
+        'download_shopping_cart':
+            '/api/recipes/download_shopping_cart/?format=txt',
+        'ingredients:search':
+            f'/api/ingredients/?name={ingredient.name[:3]}',
+        'tags': '/api/tags/',
+    })
+
+    return cases
+
+
+def measure(client, url, repeat, warmup):
+    for _ in range(warmup):
+        client.get(url)
+    durations = []
+    queries = []
+    sizes = []
+    for _ in range(repeat):
+        with track_queries() as timer:
+            started = perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                size = sum(map(len, response.streaming_content))
+            else:
+                size = len(response.content)
+            durations.append(perf_counter() - started)
+        queries.append(timer.count)
+        sizes.append(size)
+    durations.sort()
+    result = {
+        'url': url,
+        'status': response.status_code,
+        'queries': max(queries),
+        'bytes': max(sizes),
+    }
+    for quantile in PROFILING_QUANTILES:
+        result[f'p{round(quantile * 100)}_ms'] = round(
+            percentile(durations, quantile) * 1000, 2)
+
+    return result
+
+
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result['queries'] > previous['queries']:
+            regressions.append(
+                f'{name}: запросов {previous["queries"]} → '
+                f'{result["queries"]}')
+        if result['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {previous["p95_ms"]} → {result["p95_ms"]} мс')
+
+    return regressions
+
+
+class Command(BaseCommand):
+    help = "Measure latency, query count and size of the key API requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument(
+            '--user', help='Имя пользователя, от которого идут запросы')
+        parser.add_argument(
+            '--only', action='append',
+            help='Замерить только сценарии с этим префиксом')
+        parser.add_argument('--output', help='Сохранить результаты в JSON')
+        parser.add_argument(
+            '--baseline', help='JSON прошлого запуска для сравнения')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост p95 относительно baseline')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть положительным')
+        user, client = get_client(options['user'])
+
+        results = {}
+        for name, url in get_cases(user).items():
+            if options['only'] and not any(
+                    name.startswith(prefix) for prefix in options['only']):
+                continue
+            results[name] = measure(
+                client, url, options['repeat'], options['warmup'])
+            self.stderr.write(
+                f'{name}: p50 {results[name]["p50_ms"]} мс, '
+                f'{results[name]["queries"]} SQL, '
+                f'{results[name]["bytes"]} Б')
+
+        report = json.dumps(results, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report)
+        else:
+            self.stdout.write(report)
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            regressions = find_regressions(
+                results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Регрессии:\n' + '\n'.join(regressions))
+            self.stderr.write('Регрессий нет')
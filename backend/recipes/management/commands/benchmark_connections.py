@@ -0,0 +1,152 @@
+import json
+from threading import Lock, Thread
+from time import perf_counter
+from weakref import WeakSet
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.db.backends.signals import connection_created
+
+from core.constants import PROFILING_QUANTILES
+from core.postgresql.base import DatabaseWrapper, pools
+from core.profiling import percentile
+from .benchmark_api import get_client
+
+MODES = ('close', 'persistent', 'pool')
+
+
+class ConnectCounter:
+    """Counts connections opened to the server, not taken from the pool."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.seen = WeakSet()
+        self.count = 0
+
+    def __call__(self, sender, connection, **kwargs):
+        with self.lock:
+            try:
+                if connection.connection in self.seen:
+                    return
+                self.seen.add(connection.connection)
+            except TypeError:
+                pass  # sqlite3 connections have no weak references
+            self.count += 1
+
+
+def configure(settings_dict, mode):
+    settings_dict['CONN_MAX_AGE'] = 600 if mode == 'persistent' else 0
+    settings_dict['OPTIONS'].pop('pool', None)
+    if mode == 'pool':
+        # What the deployment gets, not a pool sized for the benchmark.
+        settings_dict['OPTIONS']['pool'] = settings.DB_POOL
+
+
+def drain_pool():
+    pool = pools.pop(DEFAULT_DB_ALIAS, None)
+    if pool is not None:
+        pool.close()
+
+
+def run(url, username, concurrency, requests):
+    durations = []
+    errors = []
+
+    def worker():
+        _, client = get_client(username)
+        try:
+            for _ in range(requests):
+                started = perf_counter()
+                # The test client skips the connection handling of servers.
+                close_old_connections()
+                response = client.get(url)
+                close_old_connections()
+                durations.append(perf_counter() - started)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+        finally:
+            connections.close_all()
+
+    threads = [Thread(target=worker) for _ in range(concurrency)]
+    started = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return perf_counter() - started, sorted(durations), errors
+
+
+class Command(BaseCommand):
+    help = "Compare request latency with and without connection reuse"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/api/users/me/')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Запросов в каждом потоке')
+        parser.add_argument(
+            '--user', help='Имя пользователя, от которого идут запросы')
+        parser.add_argument(
+            '--mode', action='append', choices=MODES,
+            help='Режимы работы с соединениями, по умолчанию все')
+        parser.add_argument('--output', help='Сохранить результаты в JSON')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError(
+                '--concurrency и --requests должны быть положительными')
+        modes = options['mode'] or MODES
+        connection = connections[DEFAULT_DB_ALIAS]
+        if 'pool' in modes and not isinstance(connection, DatabaseWrapper):
+            raise CommandError(
+                'Пул доступен только с ENGINE=core.postgresql')
+        if 'pool' in modes and not settings.DB_POOL['max_size']:
+            raise CommandError(
+                'Для режима pool задайте DB_POOL_MAX_SIZE')
+        get_client(options['user'])
+        settings_dict = connection.settings_dict
+        original = {
+            'CONN_MAX_AGE': settings_dict['CONN_MAX_AGE'],
+            'OPTIONS': dict(settings_dict['OPTIONS']),
+        }
+        counter = ConnectCounter()
+        connection_created.connect(counter)
+        results = {}
+        try:
+            for mode in modes:
+                connections.close_all()
+                drain_pool()
+                configure(settings_dict, mode)
+                counter.count = 0
+                elapsed, durations, errors = run(
+                    options['url'], options['user'],
+                    options['concurrency'], options['requests'])
+                result = {
+                    'requests': len(durations),
+                    'errors': len(errors),
+                    'connects': counter.count,
+                    'rps': round(len(durations) / elapsed, 1),
+                }
+                for quantile in PROFILING_QUANTILES:
+                    result[f'p{round(quantile * 100)}_ms'] = round(
+                        percentile(durations, quantile) * 1000, 2)
+                results[mode] = result
+                self.stderr.write(
+                    f'{mode}: p50 {result["p50_ms"]} мс, '
+                    f'{result["rps"]} запросов/с, '
+                    f'соединений {result["connects"]}')
+        finally:
+            connection_created.disconnect(counter)
+            connections.close_all()
+            drain_pool()
+            settings_dict.update(original)
+
+        report = json.dumps(results, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report)
+        else:
+            self.stdout.write(report)
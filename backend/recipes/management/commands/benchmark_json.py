@@ -0,0 +1,92 @@
+import json
+from collections import OrderedDict
+from io import BytesIO
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import RecipeListSerializer
+from core.constants import PROFILING_QUANTILES
+from core.profiling import percentile
+from recipes.models import Recipe
+from .seed_data import USERNAME_PREFIX
+
+User = get_user_model()
+
+
+def get_page(username, page_size):
+    user = User.objects.filter(
+        username=username or f'{USERNAME_PREFIX}0').first() or AnonymousUser()
+    request = Request(RequestFactory().get('/api/recipes/'))
+    request.user = user
+    recipes = RecipeListSerializer.setup_eager_loading(
+        Recipe.objects.order_by('-pub_date'), user)[:page_size]
+    if not recipes:
+        raise CommandError(
+            'Нет данных для замеров, сначала запустите seed_data')
+    serializer = RecipeListSerializer(
+        recipes, many=True, context={'request': request})
+
+    return OrderedDict((
+        ('count', Recipe.objects.count()),
+        ('next', 'http://testserver/api/recipes/?page=2'),
+        ('previous', None),
+        ('results', serializer.data),
+    ))
+
+
+def timings(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = perf_counter()
+        function()
+        durations.append(perf_counter() - started)
+    durations.sort()
+
+    return {
+        f'p{round(quantile * 100)}_us': round(
+            percentile(durations, quantile) * 10 ** 6, 1)
+        for quantile in PROFILING_QUANTILES
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare the stdlib and orjson renderer and parser on a page"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=1000)
+        parser.add_argument('--page-size', type=int, default=6)
+        parser.add_argument(
+            '--user', help='Имя пользователя, для которого строится ответ')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1 or options['page_size'] < 1:
+            raise CommandError(
+                '--repeat и --page-size должны быть положительными')
+        if orjson is None:
+            raise CommandError('orjson не установлен')
+        data = get_page(options['user'], options['page_size'])
+        content = JSONRenderer().render(data)
+        if FastJSONRenderer().render(data) != content:
+            raise CommandError('Ответы рендереров различаются')
+        if FastJSONParser().parse(BytesIO(content)) != json.loads(content):
+            raise CommandError('Результаты парсеров различаются')
+
+        results = {'bytes': len(content)}
+        for name, renderer in (('render:stdlib', JSONRenderer()),
+                               ('render:orjson', FastJSONRenderer())):
+            results[name] = timings(
+                lambda: renderer.render(data), options['repeat'])
+        for name, parser in (('parse:stdlib', JSONParser()),
+                             ('parse:orjson', FastJSONParser())):
+            results[name] = timings(
+                lambda: parser.parse(BytesIO(content)), options['repeat'])
+        self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
@@ -0,0 +1,95 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import (FeedEntry, Favorites, Ingredient, Recipe,
+                            ShoppingCart, ShoppingListItem)
+from recipes.search import get_candidate_querysets
+from users.models import Subscription
+
+
+def get_hot_paths():
+    """Hot filter paths of the API and the index each one must use.
+
+    ``None`` accepts any index: unique constraints are named differently
+    by each backend.
+    """
+    paths = [
+        ('лента рецептов',
+         Recipe.objects.order_by('-pub_date')[:6],
+         'recipe_pub_date_idx'),
+        ('рецепты автора',
+         Recipe.objects.filter(author_id=1).order_by('-pub_date')[:6],
+         'recipe_author_pub_date_idx'),
+        ('лента подписок',
+         FeedEntry.objects.filter(user_id=1).order_by('-recipe_id')[:6],
+         None),
+        ('популярные рецепты',
+         Recipe.objects.order_by('-favorites_count', '-pub_date')[:6],
+         'recipe_favorites_count_idx'),
+        ('избранное пользователя',
+         Favorites.objects.filter(user_id=1).order_by('-date_added'),
+         'favorite_user_date_idx'),
+        ('рецепт в корзине пользователя',
+         ShoppingCart.objects.filter(user_id=1, recipe_id=1),
+         None),
+        ('список покупок пользователя',
+         ShoppingListItem.objects.filter(user_id=1),
+         None),
+        ('подписки пользователя',
+         Subscription.objects.filter(user_id=1).order_by('subs_date'),
+         'subscription_user_date_idx'),
+    ]
+    if connection.vendor == 'postgresql':
+        paths.append((
+            'поиск ингредиента по началу названия',
+            Ingredient.objects.filter(name__istartswith='абр'),
+            'ingredient_name_upper_prefix_idx',
+        ))
+        matched, similar, in_ingredients = get_candidate_querysets('суп')
+        paths += [
+            ('полнотекстовый поиск рецептов', matched,
+             'recipe_search_vector_idx'),
+            ('поиск рецептов по похожему названию', similar,
+             'recipe_name_trgm_idx'),
+            ('поиск рецептов по ингредиенту', in_ingredients,
+             'ingredient_name_upper_trgm_idx'),
+        ]
+
+    return paths
+
+
+def uses_index(plan, index):
+    if index is None:
+        return 'INDEX' in plan.upper()
+
+    return index in plan
+
+
+class Command(BaseCommand):
+    help = "Check that hot API queries are planned with their indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Вывести полный план каждого запроса',
+        )
+
+    def handle(self, *args, **options):
+        failed = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for title, queryset, index in get_hot_paths():
+                plan = queryset.explain()
+                used = uses_index(plan, index)
+                self.stdout.write(
+                    f'{"OK" if used else "FAIL"} {title}: {index or "индекс"}')
+                if options['verbose_plans'] or not used:
+                    self.stdout.write(plan)
+                if not used:
+                    failed.append(title)
+        if failed:
+            raise CommandError(
+                f'Индексы не используются: {", ".join(failed)}')
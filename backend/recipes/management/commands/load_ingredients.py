@@ -1,26 +1,178 @@
 import csv
+import io
+import json
 import os
+import time
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core import constants
+from recipes.catalogue import bump_catalogue_version
 from recipes.models import Ingredient
-from api_foodgram import settings
+
+FIELDS = ('name', 'measurement_unit')
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if not row or tuple(row) == FIELDS:
+            continue
+        yield row[0], row[1]
+
+
+def read_json(file):
+    """Decode the objects of a top-level JSON array one by one."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+            position += 1
+        if position == len(buffer):
+            if eof:
+                return
+            buffer = file.read(constants.JSON_READ_CHUNK_SIZE)
+            position = 0
+            eof = not buffer
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = file.read(constants.JSON_READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        position = end
+        yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
+
+def batched(rows, batch_size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
 
 
-def ingredient_create(row):
-    Ingredient.objects.get_or_create(
-        name=row[0],
-        measurement_unit=row[1]
+def bulk_insert(batch):
+    Ingredient.objects.bulk_create(
+        [Ingredient(name=name, measurement_unit=unit)
+         for name, unit in batch],
+        ignore_conflicts=True,
+    )
+
+
+def copy_insert(cursor, batch):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(batch)
+    buffer.seek(0)
+    cursor.execute('TRUNCATE tmp_ingredients')
+    cursor.copy_expert(
+        'COPY tmp_ingredients (name, measurement_unit) '
+        'FROM STDIN WITH (FORMAT csv)',
+        buffer
+    )
+    cursor.execute(
+        f'INSERT INTO {Ingredient._meta.db_table} (name, measurement_unit) '
+        'SELECT DISTINCT name, measurement_unit FROM tmp_ingredients '
+        'ON CONFLICT DO NOTHING'
     )
 
 
 class Command(BaseCommand):
     help = "Load ingredients to DB"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.BASE_DIR, 'ingredients.csv'),
+            help='CSV или JSON файл с ингредиентами',
+        )
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='Формат файла, по умолчанию определяется по расширению',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=constants.INGREDIENTS_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Прочитать файл без записи в базу',
+        )
+        parser.add_argument(
+            '--truncate',
+            action='store_true',
+            help='Удалить существующие ингредиенты вместе с их '
+                 'количествами в рецептах перед загрузкой',
+        )
+
     def handle(self, *args, **options):
-        path = os.path.join(settings.BASE_DIR, 'ingredients.csv')
+        path = options['path']
+        file_format = (
+            options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        )
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+
+        started = time.monotonic()
         with open(path, 'r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            next(reader)
-            for row in reader:
-                ingredient_create(row)
-        self.stdout.write("Загрузка ингредиентов завершена")
+            batches = batched(
+                READERS[file_format](file), options['batch_size'])
+            if options['dry_run']:
+                read = sum(len(batch) for batch in batches)
+                result = f'Проверка файла завершена: прочитано {read}'
+            else:
+                read, created = self.load(batches, options['truncate'])
+                bump_catalogue_version(Ingredient)
+                result = (
+                    f'Загрузка ингредиентов завершена: прочитано {read}, '
+                    f'добавлено {created}, пропущено {read - created}'
+                )
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            f'{result} за {elapsed:.2f} с '
+            f'({read / (elapsed or 1e-9):.0f} строк/с)'
+        )
+
+    @transaction.atomic
+    def load(self, batches, truncate):
+        if truncate:
+            Ingredient.objects.all().delete()
+        count_before = Ingredient.objects.count()
+        read = 0
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'CREATE TEMP TABLE tmp_ingredients '
+                    '(name text, measurement_unit text) ON COMMIT DROP'
+                )
+                for batch in batches:
+                    copy_insert(cursor, batch)
+                    read += len(batch)
+        else:
+            for batch in batches:
+                bulk_insert(batch)
+                read += len(batch)
+
+        return read, Ingredient.objects.count() - count_before
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import make_thumbnails, needs_thumbnails
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Render missing recipe image thumbnails"
+
+    def handle(self, *args, **options):
+        processed = 0
+        for recipe in Recipe.objects.only(
+                'image', 'image_small', 'image_medium').iterator():
+            if needs_thumbnails(recipe):
+                make_thumbnails(recipe.id)
+                processed += 1
+        self.stdout.write(f'Обработано изображений: {processed}')
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.shopping_list import (compute_shopping_lists,
+                                   get_stored_shopping_lists,
+                                   rebuild_shopping_lists)
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the aggregated shopping lists"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='users',
+            help='Обработать только этого пользователя (можно повторять)',
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сравнить списки с корзинами, ничего не меняя',
+        )
+
+    def handle(self, *args, **options):
+        users = options['users']
+        if not options['verify']:
+            count = rebuild_shopping_lists(users)
+            self.stdout.write(f'Пересчитано позиций: {count}')
+            return
+
+        expected = compute_shopping_lists(users)
+        stored = get_stored_shopping_lists(users)
+        mismatched = sorted(
+            key for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        )
+        for user_id, ingredient_id in mismatched:
+            self.stdout.write(
+                f'пользователь {user_id}, ингредиент {ingredient_id}: '
+                f'{stored.get((user_id, ingredient_id))} вместо '
+                f'{expected.get((user_id, ingredient_id))}'
+            )
+        if mismatched:
+            raise CommandError(f'Расхождений: {len(mismatched)}')
+        self.stdout.write(f'Проверено позиций: {len(expected)}')
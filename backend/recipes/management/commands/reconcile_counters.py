@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from recipes.counters import COUNTERS, get_actual_counts
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Recount favorites and cart counters of recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не меняя',
+        )
+
+    def handle(self, *args, **options):
+        fields = tuple(COUNTERS.values())
+        actual = {
+            f'actual_{field}': expression
+            for field, expression in get_actual_counts().items()
+        }
+        drift = Q()
+        for field in fields:
+            drift |= ~Q(**{field: F(f'actual_{field}')})
+        recipes = list(Recipe.objects.annotate(**actual).filter(
+            drift).only('id', *fields))
+        for recipe in recipes:
+            self.stdout.write(f'рецепт {recipe.id}: ' + ', '.join(
+                f'{field} {getattr(recipe, field)} → '
+                f'{getattr(recipe, f"actual_{field}")}'
+                for field in fields
+            ))
+            for field in fields:
+                setattr(recipe, field, getattr(recipe, f'actual_{field}'))
+        if not options['dry_run']:
+            Recipe.objects.bulk_update(recipes, fields)
+        self.stdout.write(f'Рецептов с расхождениями: {len(recipes)}')
@@ -0,0 +1,194 @@
+import random
+import time
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import constants
+from recipes.catalogue import bump_catalogue_version
+from recipes.counters import get_actual_counts
+from recipes.models import (AmountIngredient, Favorites, FeedEntry,
+                            Ingredient, Recipe, ShoppingCart, Tag)
+from recipes.shopping_list import rebuild_shopping_lists
+from users.models import Subscription
+
+User = get_user_model()
+
+USERNAME_PREFIX = 'bench_user_'
+PASSWORD = 'bench-password'
+IMAGE = 'recipe_images/bench.png'
+TAGS = 3
+
+
+def sample(population, density, generator):
+    count = min(len(population), round(len(population) * density))
+
+    return generator.sample(population, count)
+
+
+class Command(BaseCommand):
+    help = "Fill the database with a synthetic dataset for benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, default=8,
+            help='Ингредиентов в каждом рецепте')
+        parser.add_argument(
+            '--catalogue', type=int, default=2000,
+            help='Минимальный размер справочника ингредиентов')
+        parser.add_argument(
+            '--follow-density', type=float, default=0.05,
+            help='Доля авторов, на которых подписан каждый пользователь')
+        parser.add_argument(
+            '--favorite-density', type=float, default=0.01,
+            help='Доля рецептов в избранном каждого пользователя')
+        parser.add_argument(
+            '--cart-density', type=float, default=0.005,
+            help='Доля рецептов в корзине каждого пользователя')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=constants.INGREDIENTS_BATCH_SIZE)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить данные предыдущего запуска')
+
+    def clear(self):
+        users = User.objects.filter(username__startswith=USERNAME_PREFIX)
+        Recipe.objects.filter(author__in=users).delete()
+        users.delete()
+
+    def create_catalogue(self, size, batch_size):
+        missing = size - Ingredient.objects.count()
+        if missing > 0:
+            Ingredient.objects.bulk_create(
+                (Ingredient(name=f'ингредиент {index}',
+                            measurement_unit='г')
+                 for index in range(missing)),
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+            bump_catalogue_version(Ingredient)
+        missing = TAGS - Tag.objects.count()
+        for index in range(max(missing, 0)):
+            Tag.objects.get_or_create(
+                slug=f'bench-{index}',
+                defaults={'name': f'bench {index}',
+                          'color': f'#00{index:02d}00'},
+            )
+
+        return (list(Ingredient.objects.values_list('id', flat=True)),
+                list(Tag.objects.values_list('id', flat=True)))
+
+    def create_users(self, count, batch_size):
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            (User(username=f'{USERNAME_PREFIX}{index}',
+                  email=f'{USERNAME_PREFIX}{index}@example.com',
+                  first_name='Bench', last_name=str(index),
+                  password=password)
+             for index in range(count)),
+            batch_size=batch_size,
+        )
+
+        return list(User.objects.filter(
+            username__startswith=USERNAME_PREFIX
+        ).values_list('id', flat=True))
+
+    def create_recipes(self, count, users, generator, batch_size):
+        Recipe.objects.bulk_create(
+            (Recipe(name=f'Рецепт {index}', text=f'Описание рецепта {index}',
+                    author_id=generator.choice(users), image=IMAGE,
+                    cooking_time=generator.randint(
+                        constants.MIN_COOKING_VALUE,
+                        constants.MAX_COOKING_VALUE))
+             for index in range(count)),
+            batch_size=batch_size,
+        )
+
+        return list(Recipe.objects.filter(
+            author_id__in=users).values_list('id', 'author_id'))
+
+    def create_relations(self, options, generator, users, recipes,
+                         ingredients, tags):
+        batch_size = options['batch_size']
+        recipe_ids = [recipe_id for recipe_id, _ in recipes]
+        per_recipe = min(options['ingredients_per_recipe'], len(ingredients))
+        AmountIngredient.objects.bulk_create(
+            (AmountIngredient(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                              amount=generator.randint(1, 500))
+             for recipe_id in recipe_ids
+             for ingredient_id in generator.sample(ingredients, per_recipe)),
+            batch_size=batch_size,
+        )
+        Recipe.tags.through.objects.bulk_create(
+            (Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+             for recipe_id in recipe_ids
+             for tag_id in generator.sample(
+                 tags, generator.randint(1, len(tags)))),
+            batch_size=batch_size,
+        )
+        for model, field, population, density in (
+                (Subscription, 'author_id', users,
+                 options['follow_density']),
+                (Favorites, 'recipe_id', recipe_ids,
+                 options['favorite_density']),
+                (ShoppingCart, 'recipe_id', recipe_ids,
+                 options['cart_density'])):
+            model.objects.bulk_create(
+                (model(user_id=user_id, **{field: target_id})
+                 for user_id in users
+                 for target_id in sample(population, density, generator)
+                 if target_id != user_id or field != 'author_id'),
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+
+    def create_feeds(self, users, recipes, batch_size):
+        by_author = defaultdict(list)
+        for recipe_id, author_id in sorted(recipes, reverse=True):
+            by_author[author_id].append(recipe_id)
+        FeedEntry.objects.bulk_create(
+            (FeedEntry(user_id=user_id, recipe_id=recipe_id)
+             for user_id, author_id in Subscription.objects.filter(
+                 user_id__in=users).values_list('user_id', 'author_id')
+             for recipe_id in by_author[author_id][
+                 :constants.FEED_BACKFILL_SIZE]),
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь')
+        started = time.monotonic()
+        generator = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            if options['clear']:
+                self.clear()
+            elif User.objects.filter(
+                    username__startswith=USERNAME_PREFIX).exists():
+                raise CommandError(
+                    'Данные уже есть, запустите команду с --clear')
+            ingredients, tags = self.create_catalogue(
+                options['catalogue'], batch_size)
+            users = self.create_users(options['users'], batch_size)
+            recipes = self.create_recipes(
+                options['recipes'], users, generator, batch_size)
+            self.create_relations(
+                options, generator, users, recipes, ingredients, tags)
+            # bulk_create skips the signals maintaining the aggregates.
+            Recipe.objects.update(**get_actual_counts())
+            rebuild_shopping_lists(users)
+            self.create_feeds(users, recipes, batch_size)
+        self.stdout.write(
+            f'Пользователей: {len(users)}, рецептов: {len(recipes)}, '
+            f'время: {time.monotonic() - started:.1f} с. '
+            f'Пароль пользователей: {PASSWORD}'
+        )
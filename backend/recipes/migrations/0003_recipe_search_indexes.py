@@ -0,0 +1,48 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SEARCH_CONFIG = 'russian'
+
+
+def get_indexes():
+    return (
+        ('recipe', GinIndex(
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('text', weight='B', config=SEARCH_CONFIG),
+            name='recipe_search_vector_idx',
+        )),
+        ('recipe', GinIndex(
+            fields=('name',),
+            opclasses=('gin_trgm_ops',),
+            name='recipe_name_trgm_idx',
+        )),
+    )
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in get_indexes():
+        schema_editor.add_index(apps.get_model('recipes', model_name), index)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in get_indexes():
+        schema_editor.remove_index(
+            apps.get_model('recipes', model_name), index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
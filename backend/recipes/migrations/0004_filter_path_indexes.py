@@ -0,0 +1,44 @@
+# Generated by Django 3.2.13 on 2026-10-18 16:43
+
+from django.db import migrations, models
+
+INGREDIENT_PREFIX_INDEX = 'ingredient_name_upper_prefix_idx'
+
+
+def create_ingredient_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INGREDIENT_PREFIX_INDEX} '
+        'ON recipes_ingredient (UPPER(name::text) text_pattern_ops)'
+    )
+
+
+def drop_ingredient_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INGREDIENT_PREFIX_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favorites',
+            index=models.Index(fields=['user', '-date_added'], include=('recipe',), name='favorite_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date'], name='recipe_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.RunPython(
+            create_ingredient_prefix_index, drop_ingredient_prefix_index),
+    ]
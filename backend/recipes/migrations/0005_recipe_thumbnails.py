@@ -0,0 +1,23 @@
+# Generated by Django 3.2.13 on 2026-10-18 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_filter_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_medium',
+            field=models.ImageField(blank=True, editable=False, upload_to='recipe_images/thumbnails/', verbose_name='Среднее изображение'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_small',
+            field=models.ImageField(blank=True, editable=False, upload_to='recipe_images/thumbnails/', verbose_name='Миниатюра'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.13 on 2026-10-18 19:31
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+FANOUT_LIMIT = 1000
+BACKFILL_SIZE = 100
+
+
+def fill_feeds(apps, schema_editor):
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscription = apps.get_model('users', 'Subscription')
+    pull_authors = Subscription.objects.values('author').annotate(
+        subscribers=Count('id')
+    ).filter(subscribers__gt=FANOUT_LIMIT).values('author')
+    for user_id, author_id in Subscription.objects.exclude(
+            author__in=pull_authors).values_list('user_id', 'author_id'):
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=user_id, recipe_id=recipe_id)
+             for recipe_id in Recipe.objects.filter(
+                 author_id=author_id
+             ).order_by('-id').values_list('id', flat=True)[:BACKFILL_SIZE]],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0002_subscription_subscription_user_date_idx'),
+        ('recipes', '0007_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='in_feeds', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
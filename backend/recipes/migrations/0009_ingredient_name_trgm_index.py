@@ -0,0 +1,32 @@
+from django.db import migrations
+
+INGREDIENT_TRGM_INDEX = 'ingredient_name_upper_trgm_idx'
+
+
+def create_ingredient_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # icontains compares UPPER(name), the index must be on the same
+    # expression to serve it.
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INGREDIENT_TRGM_INDEX} '
+        'ON recipes_ingredient USING gin (UPPER(name::text) gin_trgm_ops)'
+    )
+
+
+def drop_ingredient_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INGREDIENT_TRGM_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_feedentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_ingredient_trgm_index, drop_ingredient_trgm_index),
+    ]
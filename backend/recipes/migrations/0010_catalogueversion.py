@@ -0,0 +1,24 @@
+# Generated by Django 3.2.13 on 2026-10-18 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_ingredient_name_trgm_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueVersion',
+            fields=[
+                ('label', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Модель')),
+                ('version', models.CharField(max_length=32, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия справочника',
+                'verbose_name_plural': 'Версии справочников',
+            },
+        ),
+    ]
@@ -92,6 +92,18 @@ class Recipe(models.Model):
         verbose_name='Изображение',
         upload_to='recipe_images/'
     )
+    image_small = models.ImageField(
+        verbose_name='Миниатюра',
+        upload_to='recipe_images/thumbnails/',
+        blank=True,
+        editable=False,
+    )
+    image_medium = models.ImageField(
+        verbose_name='Среднее изображение',
+        upload_to='recipe_images/thumbnails/',
+        blank=True,
+        editable=False,
+    )
     cooking_time = models.PositiveIntegerField(
         verbose_name='Время приготовления',
     )
@@ -99,6 +111,16 @@ class Recipe(models.Model):
         'Дата публикации',
         auto_now=True,
     )
+    favorites_count = models.PositiveIntegerField(
+        'Добавили в избранное',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'Добавили в корзину',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -110,6 +132,20 @@ class Recipe(models.Model):
                 name='unique_author_recipe'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=('-pub_date',),
+                name='recipe_pub_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', '-pub_date'),
+                name='recipe_favorites_count_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name}, автор: {self.author.username}'
@@ -207,6 +243,97 @@ class Favorites(models.Model):
                 name='unique_favorite_recipe'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('user', '-date_added'),
+                include=('recipe',),
+                name='favorite_user_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user.username} => {self.recipe.name}'
+
+
+class ShoppingListItem(models.Model):
+    """Running ingredient totals of a user's shopping cart."""
+
+    user = models.ForeignKey(
+        verbose_name='Пользователь',
+        to=User,
+        related_name='shopping_list',
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        verbose_name='Ингредиент',
+        to=Ingredient,
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+    amount = models.IntegerField(
+        'Количество',
+    )
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списка покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user.username}, {self.ingredient.name}'
+
+
+class FeedEntry(models.Model):
+    """Recipe copied to the timeline of an author's subscriber."""
+
+    user = models.ForeignKey(
+        verbose_name='Подписчик',
+        to=User,
+        related_name='feed',
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        verbose_name='Рецепт',
+        to=Recipe,
+        related_name='in_feeds',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user.username} <= {self.recipe.name}'
+
+
+class CatalogueVersion(models.Model):
+    """Version of a reference table, shared by every server process."""
+
+    label = models.CharField(
+        'Модель',
+        max_length=constants.MAX_LEN_CATALOGUE_LABEL,
+        primary_key=True,
+    )
+    version = models.CharField(
+        'Версия',
+        max_length=constants.CATALOGUE_VERSION_LENGTH,
+    )
+
+    class Meta:
+        verbose_name = 'Версия справочника'
+        verbose_name_plural = 'Версии справочников'
+
+    def __str__(self):
+        return f'{self.label}: {self.version}'
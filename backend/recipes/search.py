@@ -0,0 +1,96 @@
+from django.db import connection
+from django.db.models import Case, FloatField, Value, When
+
+from core.constants import SEARCH_CONFIG
+from .models import AmountIngredient, Recipe
+
+
+def get_search_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def get_candidate_querysets(query):
+    """Recipe ids matched by each index: full text, name and ingredients."""
+    from django.contrib.postgres.search import SearchQuery
+
+    search_query = SearchQuery(
+        query, config=SEARCH_CONFIG, search_type='websearch')
+
+    return (
+        Recipe.objects.annotate(search=get_search_vector()).filter(
+            search=search_query).order_by().values_list('id', flat=True),
+        Recipe.objects.filter(name__trigram_similar=query).order_by(
+        ).values_list('id', flat=True),
+        AmountIngredient.objects.filter(
+            ingredient__name__icontains=query
+        ).order_by().values_list('recipe_id', flat=True),
+    )
+
+
+def search_postgresql(queryset, query):
+    from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                TrigramSimilarity)
+
+    # An OR of the three matches could not use their indexes together.
+    matched, *others = get_candidate_querysets(query)
+    candidates = set(matched.union(*others))
+    search_query = SearchQuery(
+        query, config=SEARCH_CONFIG, search_type='websearch')
+
+    return queryset.filter(id__in=candidates).annotate(
+        rank=(
+            SearchRank(get_search_vector(), search_query)
+            + TrigramSimilarity('name', query)
+        ),
+    ).order_by('-rank', '-pub_date')
+
+
+def get_score(words, name, text, ingredients):
+    score = 0.0
+    for word in words:
+        if name.startswith(word):
+            score += 1.0
+        if word in name:
+            score += 1.0
+        if word in text:
+            score += 0.4
+        if any(word in ingredient for ingredient in ingredients):
+            score += 0.2
+
+    return score
+
+
+def search_python(queryset, query):
+    """Substring scoring used where full-text search is unavailable."""
+    words = query.casefold().split()
+    recipes = queryset.order_by().values_list('id', 'name', 'text')
+    ingredients = {}
+    for recipe_id, name in AmountIngredient.objects.filter(
+            recipe__in=queryset.order_by().values('id')
+    ).values_list('recipe_id', 'ingredient__name'):
+        ingredients.setdefault(recipe_id, []).append(name.casefold())
+    scores = {}
+    for recipe_id, name, text in recipes:
+        score = get_score(words, name.casefold(), text.casefold(),
+                          ingredients.get(recipe_id, ()))
+        if score:
+            scores[recipe_id] = score
+
+    return queryset.filter(id__in=scores).annotate(rank=Case(
+        *(When(id=recipe_id, then=Value(score))
+          for recipe_id, score in scores.items()),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )).order_by('-rank', '-pub_date')
+
+
+def search_recipes(queryset, query):
+    if connection.vendor == 'postgresql':
+        return search_postgresql(queryset, query)
+
+    return search_python(queryset, query)
@@ -0,0 +1,113 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from core.constants import INGREDIENTS_BATCH_SIZE
+from .models import AmountIngredient, ShoppingCart, ShoppingListItem
+
+
+def get_recipe_amounts(recipe_ids):
+    return dict(AmountIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values('ingredient_id').annotate(
+        total_amount=Sum('amount')
+    ).order_by().values_list('ingredient_id', 'total_amount'))
+
+
+def apply_amounts(user_ids, amounts):
+    """Add ``amounts`` (ingredient id => delta) to the users' lists."""
+    amounts = {
+        ingredient_id: amount
+        for ingredient_id, amount in amounts.items() if amount
+    }
+    if not user_ids or not amounts:
+        return
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=amounts)
+    with transaction.atomic():
+        ShoppingListItem.objects.bulk_create(
+            [ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id,
+                              amount=0)
+             for user_id in user_ids
+             for ingredient_id, amount in amounts.items() if amount > 0],
+            ignore_conflicts=True,
+        )
+        items.update(amount=F('amount') + Case(
+            *(When(ingredient_id=ingredient_id, then=Value(amount))
+              for ingredient_id, amount in amounts.items()),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        items.filter(amount__lte=0).delete()
+
+
+def add_recipes(user_id, recipe_ids):
+    apply_amounts([user_id], get_recipe_amounts(recipe_ids))
+
+
+def remove_recipes(user_id, recipe_ids):
+    apply_amounts([user_id], {
+        ingredient_id: -amount
+        for ingredient_id, amount in get_recipe_amounts(recipe_ids).items()
+    })
+
+
+def change_recipe_amounts(recipe_id, amounts):
+    """Propagate an ingredient diff of a recipe to every cart holding it."""
+    if any(amounts.values()):
+        apply_amounts(
+            list(ShoppingCart.objects.filter(
+                recipe_id=recipe_id).values_list('user_id', flat=True)),
+            amounts,
+        )
+
+
+def compute_shopping_lists(user_ids=None):
+    """Aggregate shopping lists from scratch, the source of truth."""
+    carts = ShoppingCart.objects.all()
+    if user_ids is not None:
+        carts = carts.filter(user_id__in=user_ids)
+
+    return {
+        (row['user_id'], row['ingredient_id']): row['total_amount']
+        for row in AmountIngredient.objects.filter(
+            recipe__recipe_shopping_cart__in=carts
+        ).values(
+            'ingredient_id',
+            user_id=F('recipe__recipe_shopping_cart__user_id'),
+        ).annotate(total_amount=Sum('amount')).order_by()
+    }
+
+
+def get_stored_shopping_lists(user_ids=None):
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in items.values_list(
+            'user_id', 'ingredient_id', 'amount')
+    }
+
+
+@transaction.atomic
+def rebuild_shopping_lists(user_ids=None):
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    items.delete()
+    totals = compute_shopping_lists(user_ids)
+    ShoppingListItem.objects.bulk_create(
+        (ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id,
+                          amount=amount)
+         for (user_id, ingredient_id), amount in totals.items()),
+        batch_size=INGREDIENTS_BATCH_SIZE,
+    )
+
+    return len(totals)
+
+
+def rebuild_recipe_carts(recipe_id):
+    """Recount the lists of everyone holding the recipe in the cart."""
+    rebuild_shopping_lists(list(ShoppingCart.objects.filter(
+        recipe_id=recipe_id).values_list('user_id', flat=True)))
@@ -0,0 +1,156 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from core.signals import memberships_created, memberships_deleted
+from users.models import Subscription
+from .catalogue import bump_catalogue_version
+from .counters import COUNTERS, change_counter
+from .feed import backfill, prune
+from .images import needs_thumbnails, schedule_thumbnails
+from .models import Ingredient, Recipe, ShoppingCart, Tag
+from .shopping_list import add_recipes, remove_recipes
+
+
+def bump_version(sender, **kwargs):
+    bump_catalogue_version(sender)
+
+
+for model in (Ingredient, Tag):
+    for signal in (post_save, post_delete):
+        signal.connect(
+            bump_version,
+            sender=model,
+            dispatch_uid=f'catalogue_{signal}_{model.__name__}',
+        )
+
+
+def process_recipe_image(sender, instance, **kwargs):
+    if needs_thumbnails(instance):
+        transaction.on_commit(lambda: schedule_thumbnails(instance.id))
+
+
+post_save.connect(
+    process_recipe_image,
+    sender=Recipe,
+    dispatch_uid='recipe_image_thumbnails',
+)
+
+
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        add_recipes(instance.user_id, [instance.recipe_id])
+
+
+def add_many_to_shopping_list(sender, user_id, ids, **kwargs):
+    add_recipes(user_id, ids)
+
+
+def remove_from_shopping_list(sender, instance, **kwargs):
+    # pre_delete: the recipe ingredients are still there on cascades.
+    remove_recipes(instance.user_id, [instance.recipe_id])
+
+
+def remove_many_from_shopping_list(sender, user_id, ids, **kwargs):
+    remove_recipes(user_id, ids)
+
+
+post_save.connect(
+    add_to_shopping_list,
+    sender=ShoppingCart,
+    dispatch_uid='shopping_list_add',
+)
+memberships_created.connect(
+    add_many_to_shopping_list,
+    sender=ShoppingCart,
+    dispatch_uid='shopping_list_add_many',
+)
+pre_delete.connect(
+    remove_from_shopping_list,
+    sender=ShoppingCart,
+    dispatch_uid='shopping_list_remove',
+)
+memberships_deleted.connect(
+    remove_many_from_shopping_list,
+    sender=ShoppingCart,
+    dispatch_uid='shopping_list_remove_many',
+)
+
+
+def increment_counter(sender, instance, created, **kwargs):
+    if created:
+        change_counter(sender, [instance.recipe_id], 1)
+
+
+def increment_counters(sender, user_id, ids, **kwargs):
+    change_counter(sender, ids, 1)
+
+
+def decrement_counter(sender, instance, **kwargs):
+    change_counter(sender, [instance.recipe_id], -1)
+
+
+def decrement_counters(sender, user_id, ids, **kwargs):
+    change_counter(sender, ids, -1)
+
+
+for model in COUNTERS:
+    post_save.connect(
+        increment_counter,
+        sender=model,
+        dispatch_uid=f'counter_increment_{model.__name__}',
+    )
+    memberships_created.connect(
+        increment_counters,
+        sender=model,
+        dispatch_uid=f'counter_increment_many_{model.__name__}',
+    )
+    post_delete.connect(
+        decrement_counter,
+        sender=model,
+        dispatch_uid=f'counter_decrement_{model.__name__}',
+    )
+    memberships_deleted.connect(
+        decrement_counters,
+        sender=model,
+        dispatch_uid=f'counter_decrement_many_{model.__name__}',
+    )
+
+
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        backfill(instance.user_id, instance.author_id)
+
+
+def backfill_feeds(sender, user_id, ids, **kwargs):
+    for author_id in ids:
+        backfill(user_id, author_id)
+
+
+def prune_feed(sender, instance, **kwargs):
+    prune(instance.user_id, [instance.author_id])
+
+
+def prune_feeds(sender, user_id, ids, **kwargs):
+    prune(user_id, ids)
+
+
+post_save.connect(
+    backfill_feed,
+    sender=Subscription,
+    dispatch_uid='feed_backfill',
+)
+memberships_created.connect(
+    backfill_feeds,
+    sender=Subscription,
+    dispatch_uid='feed_backfill_many',
+)
+post_delete.connect(
+    prune_feed,
+    sender=Subscription,
+    dispatch_uid='feed_prune',
+)
+memberships_deleted.connect(
+    prune_feeds,
+    sender=Subscription,
+    dispatch_uid='feed_prune_many',
+)
@@ -0,0 +1,59 @@
+import base64
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from .images import make_thumbnails
+from .models import Recipe
+
+User = get_user_model()
+
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAC'
+    'hwGA60e6kgAAAABJRU5ErkJggg=='
+)
+# Pillow reads XPM but cannot write it.
+XPM = b'/* XPM */\nstatic char *x[] = {\n"1 1 1 1",\n"a c #000000",\n"a"\n};\n'
+
+
+class ThumbnailsTest(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root, IMAGE_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pw')
+
+    def create_recipe(self, name, content):
+        return Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Описание',
+            cooking_time=10, image=SimpleUploadedFile(name, content))
+
+    def test_replaces_image_and_renders_thumbnails(self):
+        recipe = self.create_recipe('recipe.png', PNG)
+        source = recipe.image.name
+        make_thumbnails(recipe.id)
+        recipe.refresh_from_db()
+        self.assertNotEqual(recipe.image.name, source)
+        self.assertFalse(default_storage.exists(source))
+        for name in (recipe.image.name, recipe.image_small.name,
+                     recipe.image_medium.name):
+            self.assertTrue(default_storage.exists(name))
+
+    def test_keeps_source_when_encoding_fails(self):
+        recipe = self.create_recipe('recipe.xpm', XPM)
+        source = recipe.image.name
+        with self.assertRaises(KeyError):
+            make_thumbnails(recipe.id)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image.name, source)
+        self.assertTrue(default_storage.exists(source))
+        self.assertEqual(
+            default_storage.listdir('recipe_images')[1], ['recipe.xpm'])
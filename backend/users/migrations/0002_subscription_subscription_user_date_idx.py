@@ -0,0 +1,17 @@
+# Generated by Django 3.2.13 on 2026-10-18 16:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['user', 'subs_date'], include=('author',), name='subscription_user_date_idx'),
+        ),
+    ]
@@ -65,6 +65,13 @@ class Subscription(models.Model):
                 name='unique_author_user'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('user', 'subs_date'),
+                include=('author',),
+                name='subscription_user_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user.username} => {self.author.username}'